@@ -0,0 +1,372 @@
+"""Offline benchmark for the JANUS bot's hot paths.
+
+Sends every ship command and `!janus` query through the bot's on_message
+handler as fake Discord messages, so prefix parsing, argument conversion
+and the spoken echo of JANUS's own replies are all exercised, and drives
+the speech queue directly. Fake objects stand in for Discord and a local
+aiohttp app for the Ollama API. The harness then reports
+per-operation latency percentiles, event-loop stalls and throughput.
+Nothing connects to Discord, Ollama or Google.
+
+    python janus_bench.py --concurrency 8 --rounds 20 --first-token 0.2 --token-delay 0.02
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import shutil
+import tempfile
+import threading
+import time
+from aiohttp import web
+from discord.ext import commands
+
+import janus_ship_systems
+import janus_voice
+import persephone_commands
+import persephone_state
+
+# --- Local Ollama Stand-In ---
+REPLY = "Diagnostics complete. Hull integrity at 82 percent. Reactor output nominal. Crew welfare not evaluated."
+
+
+def fake_ollama(first_token, token_delay):
+    """aiohttp app answering /api/generate with a canned reply at a configurable pace."""
+    tokens = [word + " " for word in REPLY.split()]
+    loaded = []
+
+    async def ps(request):
+        return web.json_response({"models": [{"name": name} for name in loaded]})
+
+    async def generate(request):
+        payload = await request.json()
+        await asyncio.sleep(first_token)
+        if "prompt" not in payload:
+            # Preload request: the model is now resident
+            model = payload["model"]
+            loaded.append(model if ":" in model else f"{model}:latest")
+            return web.json_response({"model": payload["model"], "response": "", "done": True})
+        stats = {"done": True, "prompt_eval_count": len(payload["prompt"]) // 4,
+                 "eval_count": len(tokens), "context": [1, 2, 3]}
+        if not payload.get("stream"):
+            await asyncio.sleep(token_delay * len(tokens))
+            return web.json_response({"response": REPLY, **stats})
+
+        response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+        await response.prepare(request)
+        for token in tokens:
+            await response.write(json.dumps({"response": token, "done": False}).encode() + b"\n")
+            await asyncio.sleep(token_delay)
+        await response.write(json.dumps({"response": "", **stats}).encode() + b"\n")
+        await response.write_eof()
+        return response
+
+    app = web.Application()
+    app.router.add_post("/api/generate", generate)
+    app.router.add_get("/api/ps", ps)
+    return app
+
+
+# --- Fake Discord Objects ---
+_ids = itertools.count(1000)
+_echoes = set()  # Gateway echoes of the bot's own messages still being handled
+
+
+class FakeGuild:
+    def __init__(self):
+        self.id = next(_ids)
+        self.voice_client = None
+
+
+class FakeMessage:
+    _state = None  # Read (never used) by commands.Context
+
+    def __init__(self, content, author, channel):
+        self.id = next(_ids)
+        self.content = content
+        self.author = author
+        self.channel = channel
+        self.guild = channel.guild
+        self.attachments = []
+        self.error = None  # Set by BenchBot.on_command_error
+
+    async def edit(self, content=None, **kwargs):
+        self.content = content
+
+    async def add_reaction(self, emoji):
+        pass
+
+    async def delete(self):
+        pass
+
+
+class FakeChannel:
+    def __init__(self, guild, channel_id=None):
+        self.id = channel_id or next(_ids)
+        self.guild = guild
+        self.sent = 0
+
+    async def send(self, content=None, **kwargs):
+        self.sent += 1
+        message = FakeMessage(content or "", BOT_USER, self)  # Embed-only messages have empty content
+        # Discord delivers the bot's own messages back to on_message, which is how JANUS replies get spoken
+        echo = asyncio.create_task(janus_ship_systems.on_message(message))
+        _echoes.add(echo)
+        echo.add_done_callback(_echoes.discard)
+        return message
+
+
+class FakeUser:
+    def __init__(self, bot=False):
+        self.id = next(_ids)
+        self.bot = bot
+        self.voice = None
+
+
+BOT_USER = FakeUser(bot=True)
+
+
+class FakeVoiceClient:
+    """Plays a clip by waiting clip_seconds on a timer thread, like the real player thread."""
+
+    def __init__(self, guild, clip_seconds):
+        self.guild = guild
+        self.clip_seconds = clip_seconds
+        self._playing = False
+
+    def is_connected(self):
+        return True
+
+    def is_playing(self):
+        return self._playing
+
+    def play(self, source, after=None):
+        self._playing = True
+
+        def finish():
+            self._playing = False
+            if after:
+                after(None)
+
+        threading.Timer(self.clip_seconds, finish).start()
+
+
+class BenchContext(commands.Context):
+    async def send(self, content=None, **kwargs):
+        return await self.channel.send(content, **kwargs)
+
+
+class BenchBot(commands.Bot):
+    """The bot's commands behind the gateway-facing parts a real connection would fill in."""
+
+    def __init__(self, source):
+        super().__init__(command_prefix=source.command_prefix, intents=source.intents, help_command=None)
+        for command in list(source.commands):
+            source.remove_command(command.name)
+            self.add_command(command)
+        self.speak_alert = source.speak_alert
+        self.channels = {}  # id -> FakeChannel; the ship channel ids are shared by every fake guild
+        self.fake_voice_clients = []
+
+    @property
+    def user(self):
+        return BOT_USER
+
+    @property
+    def voice_clients(self):
+        return self.fake_voice_clients
+
+    def get_channel(self, channel_id):
+        return self.channels.get(channel_id)
+
+    async def get_context(self, origin, *, cls=BenchContext):
+        return await super().get_context(origin, cls=cls)
+
+    async def on_command_error(self, ctx, error):
+        ctx.message.error = error
+
+
+# --- Workload ---
+# (label, message text); each is sent through on_message like a player's message
+COMMANDS = [
+    ("!ship", "!ship"),
+    ("!ship <room>", "!ship medical bay"),
+    ("!deckplan", "!deckplan"),
+    ("!rooms", "!rooms"),
+    ("!crew", "!crew"),
+    ("!extractors", "!extractors"),
+    ("!ai", "!ai"),
+    ("!status", "!status"),
+    ("!report", "!report"),
+    ("!damage", "!damage medbay"),
+    ("!repair", "!repair medbay"),
+    ("!lockdown", "!lockdown reactor"),
+    ("!unlock", "!unlock reactor"),
+    ("!impact", "!impact debris"),
+    ("!reset_all", "!reset_all"),
+    ("!log", "!log"),
+    ("!log <filter>", "!log medbay since 00:00"),
+    ("!whereis", "!whereis cargo"),
+    ("!route", "!route medbay to cargo"),
+    ("!isolated", "!isolated"),
+    ("!event", "!event low"),
+    ("!alert", "!alert"),
+    ("!janus_on", "!janus_on"),
+    ("!janus_off", "!janus_off"),
+    ("!help_commands", "!help_commands"),
+    ("!help_crew", "!help_crew"),
+    ("!help_ship", "!help_ship"),
+    ("!voice", "!voice en-gb"),
+    ("!test", "!test Testing vocal interface systems."),
+]
+
+JANUS_QUERIES = [
+    ("!janus <report>", "!janus diagnostics"),
+    ("!janus <report>", "!janus survey"),
+    ("!janus <chat>", "!janus what is our current heading?"),
+]
+
+SPEECH_LINES = [
+    "Red Alert. Ship systems compromised.",
+    "Environmental hazard detected. Evacuate affected zones.",
+    "Reactor output nominal.",
+]
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def watch_loop_stalls(stalls, interval=0.005, threshold=0.002):
+    """Record how late each short sleep wakes up; lateness is time the loop spent blocked."""
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        lag = loop.time() - start - interval
+        if lag > threshold:
+            stalls.append(lag)
+
+
+async def timed(samples, label, operation):
+    start = time.perf_counter()
+    try:
+        await operation
+    except Exception as e:
+        samples.setdefault(f"{label} (errors)", []).append(0.0)
+        print(f"{label} failed: {e!r}")
+        return
+    samples.setdefault(label, []).append(time.perf_counter() - start)
+
+
+async def send_message(samples, label, text, channel, author):
+    """Deliver a player's message through on_message and time it until the command returns."""
+    message = FakeMessage(text, author, channel)
+    await timed(samples, label, janus_ship_systems.on_message(message))
+    if message.error is not None:
+        samples[label].pop()
+        samples.setdefault(f"{label} (errors)", []).append(0.0)
+        print(f"{label} failed: {message.error!r}")
+
+
+async def crew_member(samples, rounds, channels, voice_client):
+    """One simulated player: cycles through every command, !janus query and spoken line."""
+    root_channel, crew_channel = channels
+    author = FakeUser()
+    for _ in range(rounds):
+        for label, text in COMMANDS:
+            channel = root_channel if text.startswith("!event") else crew_channel
+            await send_message(samples, label, text, channel, author)
+
+        for label, text in JANUS_QUERIES:
+            await send_message(samples, label, text, crew_channel, author)
+
+        for line in SPEECH_LINES:
+            played = await janus_ship_systems.speak(voice_client, line)
+            if played is not None:
+                await timed(samples, "speech (queue → played)", played)
+
+
+async def run(args):
+    runner = web.AppRunner(fake_ollama(args.first_token, args.token_delay))
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", 0).start()
+    port = runner.addresses[0][1]
+
+    # Point the bot at the stand-ins and keep its state out of the real data directory
+    data_dir = tempfile.mkdtemp(prefix="janus-bench-")
+    janus_ship_systems.llm.url = f"http://127.0.0.1:{port}/api/generate"
+    janus_ship_systems.STREAM_RESPONSES = args.stream
+    janus_ship_systems.STREAM_EDIT_INTERVAL = 0.1
+    janus_ship_systems.BOT_ID = BOT_USER.id
+    bot = janus_ship_systems.bot = BenchBot(janus_ship_systems.bot)
+    for tier in janus_ship_systems.tiers.values():
+        await tier.monitor.check()  # Preload, as on_ready does
+    persephone_commands.guild_states = persephone_state.GuildStateEngine(
+        data_dir, persephone_commands.zone_state_path, persephone_commands.MAX_LOADED_GUILDS)
+
+    async def fake_synthesize(text, lang):
+        await asyncio.sleep(args.tts_delay)
+        return text
+
+    janus_ship_systems.speech_queues = janus_voice.SpeechQueues(fake_synthesize, lambda audio: audio)
+
+    samples = {}
+    stalls = []
+    monitor = asyncio.create_task(watch_loop_stalls(stalls))
+    start = time.perf_counter()
+    try:
+        players = []
+        for _ in range(args.concurrency):
+            guild = FakeGuild()
+            root = FakeChannel(guild, persephone_commands.ROOT_COMMAND_CHANNEL_ID)
+            crew = FakeChannel(guild, persephone_commands.CREW_TERMINAL_CHANNEL_ID)
+            voice_client = guild.voice_client = FakeVoiceClient(guild, args.clip_seconds)
+            bot.channels.update({root.id: root, crew.id: crew})
+            bot.fake_voice_clients.append(voice_client)
+            players.append(crew_member(samples, args.rounds, (root, crew), voice_client))
+        await asyncio.gather(*players)
+        while _echoes:
+            await asyncio.gather(*_echoes)
+        await persephone_commands.flush_state()
+    finally:
+        elapsed = time.perf_counter() - start
+        monitor.cancel()
+        # Let background variant refills finish before the stand-in server goes away
+        await asyncio.gather(*janus_ship_systems.response_cache._refills.values(), return_exceptions=True)
+        await janus_ship_systems.llm.close()
+        await runner.cleanup()
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    report(samples, stalls, elapsed)
+
+
+def report(samples, stalls, elapsed):
+    total = sum(len(s) for s in samples.values())
+    print(f"{'operation':<28}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for label, values in sorted(samples.items()):
+        print(f"{label:<28}{len(values):>7}"
+              f"{percentile(values, 0.50) * 1000:>10.2f}"
+              f"{percentile(values, 0.95) * 1000:>10.2f}"
+              f"{percentile(values, 0.99) * 1000:>10.2f}")
+    print()
+    print(f"operations/s:     {total / elapsed:.1f} ({total} in {elapsed:.2f}s)")
+    print(f"event loop stall: {sum(stalls) * 1000:.1f} ms total, "
+          f"{max(stalls, default=0) * 1000:.1f} ms worst, {len(stalls)} stalls over 2 ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=4, help="simulated players, each in its own guild")
+    parser.add_argument("--rounds", type=int, default=5, help="passes over the full workload per player")
+    parser.add_argument("--first-token", type=float, default=0.2, help="stand-in Ollama delay before the first token (s)")
+    parser.add_argument("--token-delay", type=float, default=0.01, help="stand-in Ollama delay per token (s)")
+    parser.add_argument("--no-stream", dest="stream", action="store_false", help="disable streamed !janus replies")
+    parser.add_argument("--tts-delay", type=float, default=0.05, help="simulated synthesis time per line (s)")
+    parser.add_argument("--clip-seconds", type=float, default=0.05, help="simulated playback time per line (s)")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import json
+
+
+def load_intents(path):
+    """Load janus_intents.json, raising ValueError on malformed entries."""
+    with open(path, "r", encoding="utf-8") as f:
+        intents = json.load(f)
+    if not isinstance(intents, list):
+        raise ValueError("intents must be a JSON list")
+    for intent in intents:
+        missing = {"name", "phrases", "task"} - set(intent)
+        if missing:
+            raise ValueError(f"intent '{intent.get('name', '?')}' is missing {', '.join(sorted(missing))}")
+        if not intent["phrases"] or not all(isinstance(p, str) and p.strip() for p in intent["phrases"]):
+            raise ValueError(f"intent '{intent['name']}' needs at least one non-empty phrase")
+    return intents
+
+
+class IntentRouter:
+    """Matches `!janus` queries against every intent phrase in one pass.
+
+    The phrases are compiled into an Aho-Corasick automaton, so routing a
+    message costs one walk over its text no matter how many intents exist.
+    Phrases match anywhere in the query, case-insensitively; when several
+    intents match, the one listed first in the table wins.
+    """
+
+    def __init__(self, intents):
+        self.intents = list(intents)
+        self._goto = [{}]  # node -> {char: node}
+        self._best = [None]  # node -> index of the highest-priority intent ending here
+        for index, intent in enumerate(self.intents):
+            for phrase in intent["phrases"]:
+                self._add(phrase.lower(), index)
+        self._link()
+
+    def _add(self, phrase, index):
+        node = 0
+        for char in phrase:
+            child = self._goto[node].get(char)
+            if child is None:
+                child = len(self._goto)
+                self._goto[node][char] = child
+                self._goto.append({})
+                self._best.append(None)
+            node = child
+        if self._best[node] is None or index < self._best[node]:
+            self._best[node] = index
+
+    def _link(self):
+        # Breadth-first failure links; each node inherits the best match of its longest proper suffix
+        self._fail = [0] * len(self._goto)
+        queue = list(self._goto[0].values())
+        for node in queue:
+            for char, child in self._goto[node].items():
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                inherited = self._best[self._fail[child]]
+                if inherited is not None and (self._best[child] is None or inherited < self._best[child]):
+                    self._best[child] = inherited
+                queue.append(child)
+
+    def match(self, text):
+        """Return the intent for text, or None if no phrase occurs in it."""
+        goto, fail, best_at = self._goto, self._fail, self._best
+        node = 0
+        best = None
+        for char in text.lower():
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            found = best_at[node]
+            if found is not None and (best is None or found < best):
+                best = found
+                if best == 0:
+                    break
+        return None if best is None else self.intents[best]
@@ -0,0 +1,557 @@
+import asyncio
+import heapq
+import itertools
+import json
+import time
+from collections import OrderedDict, deque
+import aiohttp
+import janus_metrics
+
+metrics = janus_metrics.registry
+ollama_latency = metrics.histogram("janus_ollama_request_seconds", "Ollama generate round-trip time")
+ollama_first_token = metrics.histogram("janus_ollama_first_token_seconds", "Time to the first streamed token")
+ollama_prompt_tokens = metrics.histogram("janus_ollama_prompt_tokens", "Prompt tokens evaluated per request",
+                                         janus_metrics.TOKEN_BUCKETS)
+ollama_eval_tokens = metrics.histogram("janus_ollama_eval_tokens", "Tokens generated per request",
+                                       janus_metrics.TOKEN_BUCKETS)
+ollama_errors = metrics.counter("janus_ollama_errors_total", "Ollama requests that failed or timed out")
+queue_wait = metrics.histogram("janus_llm_queue_wait_seconds", "Time LLM work waited for a generation slot")
+rejected_requests = metrics.counter("janus_llm_rejected_total", "LLM work turned away because its channel queue was full")
+cancelled_requests = metrics.counter("janus_llm_cancelled_total", "LLM work cancelled because its message was deleted")
+model_load = metrics.histogram("janus_ollama_model_load_seconds", "Time to preload the model into memory")
+probe_failures = metrics.counter("janus_ollama_probe_failures_total", "Health probes that could not reach Ollama")
+coalesced_requests = metrics.counter("janus_llm_coalesced_total", "Requests that joined an identical in-flight generation")
+
+
+class OllamaClient:
+    """Async client for the Ollama generate API sharing one pooled keep-alive session."""
+
+    def __init__(self, url, model="mistral", timeout=120, max_concurrency=2, pool_size=8, keep_alive=None):
+        self.url = url
+        self.model = model
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.keep_alive = keep_alive  # Seconds Ollama keeps the model loaded after each request
+        self.last_used = {}  # model -> time.monotonic() of the last request sent to it
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._session = None
+
+    @property
+    def base_url(self):
+        return self.url.split("/api/", 1)[0]
+
+    def _get_session(self):
+        # Created lazily so the session binds to the bot's running event loop
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=60)
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+    def _payload(self, prompt, model, stream, context, options):
+        model = model or self.model
+        self.last_used[model] = time.monotonic()
+        payload = {"model": model, "prompt": prompt, "stream": stream}
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+        if context:
+            payload["context"] = context
+        if options:
+            payload["options"] = options
+        return payload
+
+    @staticmethod
+    def _record_usage(data):
+        # Ollama reports token counts on the final (done) object
+        if "prompt_eval_count" in data:
+            ollama_prompt_tokens.observe(data["prompt_eval_count"])
+        if "eval_count" in data:
+            ollama_eval_tokens.observe(data["eval_count"])
+
+    async def generate(self, prompt, model=None, timeout=None, context=None, **options):
+        """Run a single non-streaming generation and return Ollama's JSON reply.
+
+        context continues from a previous reply's "context" tokens, so only the new prompt is evaluated.
+        """
+        payload = self._payload(prompt, model, False, context, options)
+        client_timeout = aiohttp.ClientTimeout(total=timeout or self.timeout)
+        async with self._semaphore:
+            session = self._get_session()
+            try:
+                with ollama_latency.time():
+                    async with session.post(self.url, json=payload, timeout=client_timeout) as response:
+                        response.raise_for_status()
+                        data = await response.json()
+            except Exception:
+                ollama_errors.inc()
+                raise
+        self._record_usage(data)
+        return data
+
+    async def stream(self, prompt, model=None, timeout=None, context=None, final=None, **options):
+        """Yield response text fragments as Ollama produces them.
+
+        If final is a dict it is filled with Ollama's closing object (context, token counts).
+        """
+        payload = self._payload(prompt, model, True, context, options)
+        client_timeout = aiohttp.ClientTimeout(total=timeout or self.timeout)
+        async with self._semaphore:
+            session = self._get_session()
+            start = time.perf_counter()
+            first = True
+            try:
+                async with session.post(self.url, json=payload, timeout=client_timeout) as response:
+                    response.raise_for_status()
+                    # Ollama streams one JSON object per line
+                    async for line in response.content:
+                        if not line.strip():
+                            continue
+                        chunk = json.loads(line)
+                        if chunk.get("response"):
+                            if first:
+                                ollama_first_token.observe(time.perf_counter() - start)
+                                first = False
+                            yield chunk["response"]
+                        if chunk.get("done"):
+                            ollama_latency.observe(time.perf_counter() - start)
+                            self._record_usage(chunk)
+                            if final is not None:
+                                final.update(chunk)
+                            return
+            except Exception:
+                ollama_errors.inc()
+                raise
+
+    async def loaded_models(self, timeout=5):
+        """Names of the models Ollama currently holds in memory (a cheap health probe)."""
+        session = self._get_session()
+        client_timeout = aiohttp.ClientTimeout(total=timeout)
+        async with session.get(f"{self.base_url}/api/ps", timeout=client_timeout) as response:
+            response.raise_for_status()
+            data = await response.json()
+        return [model["name"] for model in data.get("models", [])]
+
+    async def preload(self, model=None):
+        """Load the model into memory (or refresh its keep-alive) without generating anything."""
+        payload = {"model": model or self.model}
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+        self.last_used[payload["model"]] = time.monotonic()
+        session = self._get_session()
+        with model_load.time():
+            async with session.post(self.url, json=payload,
+                                    timeout=aiohttp.ClientTimeout(total=self.timeout)) as response:
+                response.raise_for_status()
+                await response.read()
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+class ConversationSession:
+    """Memory of one channel's chat with JANUS.
+
+    Holds the "context" tokens Ollama returned for the last turn, so the
+    next turn only sends the new line, plus a short transcript of recent
+    turns. When the context grows past max_context tokens, or two turns
+    overlapped and branched from the same context, the context is dropped
+    and the next prompt is rebuilt from the transcript instead. Context
+    tokens only mean something to the model that produced them, so a turn
+    answered by a different model also starts from the transcript.
+    """
+
+    def __init__(self, max_context=1536, keep_turns=6):
+        self.max_context = max_context
+        self.context = None
+        self.model = None  # Model that produced self.context
+        self.turns = deque(maxlen=keep_turns)  # (user input, reply), oldest first
+        self.version = 0  # Bumped by every recorded turn
+
+    def begin(self, model=None):
+        """Return (context, version) to continue from for the next turn with model."""
+        context = self.context if model == self.model else None
+        return context, self.version
+
+    def record(self, user_input, reply, context, version, model=None):
+        self.turns.append((user_input, reply))
+        current = version == self.version and context and len(context) <= self.max_context
+        self.context = context if current else None
+        self.model = model
+        self.version += 1
+
+
+class ConversationSessions:
+    """Per-channel conversation sessions under an LRU cap."""
+
+    def __init__(self, max_sessions=64, max_context=1536, keep_turns=6):
+        self.max_sessions = max_sessions
+        self.max_context = max_context
+        self.keep_turns = keep_turns
+        self._sessions = OrderedDict()
+
+    def get(self, channel_id):
+        session = self._sessions.get(channel_id)
+        if session is None:
+            session = self._sessions[channel_id] = ConversationSession(self.max_context, self.keep_turns)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        self._sessions.move_to_end(channel_id)
+        return session
+
+    def discard(self, channel_id):
+        self._sessions.pop(channel_id, None)
+
+
+# Lower numbers run first
+PRIORITY_ROOT = 0
+PRIORITY_NORMAL = 10
+PRIORITY_BACKGROUND = 20
+
+
+class SchedulerBusy(Exception):
+    """Raised when a channel already has as much LLM work queued as it is allowed."""
+
+
+class JobCancelled(Exception):
+    """Raised to the caller when its job was cancelled by tag (e.g. its message was deleted)."""
+
+    def __init__(self, tag):
+        super().__init__(f"job {tag} cancelled")
+        self.tag = tag
+
+
+class _Job:
+    __slots__ = ("channel", "tag", "ready", "task", "cancelled", "queued")
+
+    def __init__(self, channel, tag):
+        self.channel = channel
+        self.tag = tag
+        self.queued = time.monotonic()
+        self.ready = None  # Future resolved when a waiting job is handed a slot
+        self.task = None  # The running work
+        self.cancelled = False
+
+
+class LLMScheduler:
+    """Priority admission for LLM work with bounded per-channel queues.
+
+    At most max_concurrency jobs run at once; the rest wait in priority
+    order (FIFO within a priority). A channel may have at most
+    max_per_channel jobs waiting or running; beyond that run() raises
+    SchedulerBusy instead of queueing. Jobs carry a tag (the triggering
+    message id) so they can be cancelled whether waiting or running.
+    """
+
+    def __init__(self, max_concurrency=2, max_per_channel=3):
+        self.max_concurrency = max_concurrency
+        self.max_per_channel = max_per_channel
+        self._running = 0
+        self._waiting = []  # (priority, sequence, _Job)
+        self._sequence = itertools.count()
+        self._per_channel = {}  # channel -> jobs waiting or running
+        self._jobs = set()
+        self._recent_wait = 0.0  # Moving average of queue wait, in seconds
+
+    def pending(self, channel):
+        return self._per_channel.get(channel, 0)
+
+    def expected_wait(self):
+        """Roughly how long new work would queue: zero with a free slot, else the recent/oldest wait."""
+        waiting = [job for _, _, job in self._waiting if not job.ready.done()]
+        if self._running < self.max_concurrency and not waiting:
+            return 0.0
+        oldest = max((time.monotonic() - job.queued for job in waiting), default=0.0)
+        return max(self._recent_wait, oldest)
+
+    async def run(self, fn, channel=None, priority=PRIORITY_BACKGROUND, tag=None):
+        """Run fn() once a slot is free and return its result.
+
+        Work without a channel (background refills, warm-up) is never rejected.
+        """
+        if channel is not None and self.pending(channel) >= self.max_per_channel:
+            rejected_requests.inc()
+            raise SchedulerBusy(f"channel {channel} has {self.max_per_channel} requests queued")
+        job = _Job(channel, tag)
+        self._jobs.add(job)
+        self._per_channel[channel] = self.pending(channel) + 1
+        try:
+            await self._acquire(job, priority)
+            waited = time.monotonic() - job.queued
+            queue_wait.observe(waited)
+            self._recent_wait = 0.7 * self._recent_wait + 0.3 * waited
+            try:
+                if job.cancelled:
+                    raise JobCancelled(tag)
+                job.task = asyncio.create_task(fn())
+                try:
+                    return await job.task
+                except asyncio.CancelledError:
+                    if job.cancelled:
+                        raise JobCancelled(tag) from None
+                    raise
+            finally:
+                self._release()
+        finally:
+            self._jobs.discard(job)
+            self._per_channel[channel] -= 1
+            if not self._per_channel[channel]:
+                del self._per_channel[channel]
+
+    async def _acquire(self, job, priority):
+        # Entries whose waiter gave up stay in the heap until they reach the top
+        while self._waiting and self._waiting[0][2].ready.done():
+            heapq.heappop(self._waiting)
+        if self._running < self.max_concurrency and not self._waiting:
+            self._running += 1
+            return
+        job.ready = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiting, (priority, next(self._sequence), job))
+        try:
+            await job.ready
+        except asyncio.CancelledError:
+            if job.ready.done() and not job.ready.cancelled():
+                self._release()  # A slot was handed over just as the caller was cancelled
+            raise
+
+    def _release(self):
+        # Hand the slot straight to the most urgent live waiter, if any
+        while self._waiting:
+            _, _, job = heapq.heappop(self._waiting)
+            if not job.ready.done():
+                job.ready.set_result(True)
+                return
+        self._running -= 1
+
+    def cancel(self, tag):
+        """Cancel every job with this tag, waiting or running. Returns how many were cancelled."""
+        count = 0
+        for job in [j for j in self._jobs if j.tag == tag and not j.cancelled]:
+            job.cancelled = True
+            count += 1
+            if job.task is not None:
+                job.task.cancel()
+            elif job.ready is not None and not job.ready.done():
+                job.ready.set_exception(JobCancelled(tag))
+        cancelled_requests.inc(count)
+        return count
+
+
+class SingleFlight:
+    """Runs one call per key at a time; concurrent callers with the same key share its result.
+
+    The shared call runs as its own task, so a caller that is cancelled (or
+    times out) does not cancel the generation the other callers are waiting on.
+    The call runs as the first caller's fn, so it can still be withdrawn
+    through that caller's scheduler tag; the callers left waiting then take
+    over and run it again with their own fn.
+    """
+
+    def __init__(self):
+        self._calls = {}  # key -> task
+
+    def __contains__(self, key):
+        return key in self._calls
+
+    async def do(self, key, fn):
+        while True:
+            task = self._calls.get(key)
+            started = task is None
+            if started:
+                task = asyncio.create_task(fn())
+                self._calls[key] = task
+                task.add_done_callback(lambda t: self._calls.get(key) is t and self._calls.pop(key))
+            else:
+                coalesced_requests.inc()
+            try:
+                return await asyncio.shield(task)
+            except JobCancelled:
+                if started:
+                    raise  # Our own request was withdrawn
+
+
+class ModelUnavailable(Exception):
+    """Raised instead of generating while the model is still loading or Ollama is unreachable."""
+
+    def __init__(self, state):
+        super().__init__(f"model is {state}")
+        self.state = state
+
+
+class ModelMonitor:
+    """Keeps the configured model loaded and tracks whether it can serve requests.
+
+    check() probes Ollama's loaded models. A model that is missing (at
+    startup, or unloaded after idling) is preloaded; one that has been idle
+    for half its keep-alive window gets its keep-alive refreshed, so it is
+    never unloaded between player queries. Until the first preload
+    completes the state is "cold"/"warming" and callers should answer from
+    a fallback rather than wait on the load.
+    """
+
+    COLD, WARMING, WARM, DOWN = "cold", "warming", "warm", "down"
+
+    def __init__(self, client, interval=30, on_warm=None, model=None):
+        self.client = client
+        self.model = model or client.model
+        self.interval = interval
+        self.on_warm = on_warm  # Called each time the model becomes warm
+        self.state = self.COLD
+
+    @property
+    def ready(self):
+        return self.state == self.WARM
+
+    def _loaded(self, names):
+        model = self.model
+        # "mistral" in the config matches "mistral:latest" as reported by Ollama
+        return any(name == model or (":" not in model and name.split(":")[0] == model) for name in names)
+
+    def _set(self, state, detail=""):
+        if state != self.state:
+            print(f"Ollama model {self.model}: {state}{f' ({detail})' if detail else ''}")
+            self.state = state
+            if state == self.WARM and self.on_warm:
+                self.on_warm()
+
+    async def check(self):
+        try:
+            loaded = self._loaded(await self.client.loaded_models())
+        except Exception as e:
+            probe_failures.inc()
+            self._set(self.DOWN, f"unreachable: {e or type(e).__name__}")
+            return
+        keep_alive = self.client.keep_alive
+        last_used = self.client.last_used.get(self.model)
+        idle = time.monotonic() - last_used if last_used else None
+        stale = keep_alive and idle is not None and idle > keep_alive / 2
+        if loaded and not stale:
+            self._set(self.WARM)
+            return
+        if not loaded:
+            self._set(self.WARMING)
+        try:
+            await self.client.preload(self.model)
+        except Exception as e:
+            self._set(self.DOWN, f"preload failed: {e or type(e).__name__}")
+            return
+        self._set(self.WARM)
+
+    async def run(self):
+        while True:
+            await self.check()
+            await asyncio.sleep(self.interval)
+
+
+class ModelTier:
+    """One model with its generation options, its own work queue and its own health monitor."""
+
+    def __init__(self, name, client, model, options=None, concurrency=1, max_per_channel=3,
+                 probe_interval=30, on_warm=None):
+        self.name = name
+        self.client = client
+        self.model = model
+        self.options = options or {}  # Ollama options for every request, e.g. {"num_predict": 96}
+        self.scheduler = LLMScheduler(concurrency, max_per_channel)
+        self.monitor = ModelMonitor(client, probe_interval, on_warm, model)
+
+    @property
+    def ready(self):
+        return self.monitor.ready
+
+    async def generate(self, prompt, **kwargs):
+        return await self.client.generate(prompt, model=self.model, **{**self.options, **kwargs})
+
+    def stream(self, prompt, **kwargs):
+        return self.client.stream(prompt, model=self.model, **{**self.options, **kwargs})
+
+
+class ResponseCache:
+    """TTL/LRU cache of generated replies keyed by (model, prompt).
+
+    Each key holds a small pool of pre-generated variants. Serving a reply
+    consumes one variant and schedules a background refill, so repeated
+    prompts stay varied without a generation on the request path.
+    """
+
+    def __init__(self, max_entries=128, ttl=1800, variants=3):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.variants = variants
+        self._pools = OrderedDict()  # key -> deque of (created_at, text)
+        self._tags = {}  # key -> set of tags
+        self._refills = {}  # key -> background refill task
+        self._inflight = SingleFlight()  # Cold-miss generations shared by concurrent callers
+
+    def _fresh(self, key):
+        pool = self._pools.get(key)
+        if pool is None:
+            return None
+        cutoff = time.monotonic() - self.ttl
+        while pool and pool[0][0] < cutoff:
+            pool.popleft()
+        return pool
+
+    def take(self, key):
+        """Pop one cached variant for key, or return None on a miss."""
+        pool = self._fresh(key)
+        if not pool:
+            return None
+        self._pools.move_to_end(key)
+        return pool.popleft()[1]
+
+    def put(self, key, text, tags=()):
+        pool = self._pools.setdefault(key, deque())
+        self._pools.move_to_end(key)
+        self._tags.setdefault(key, set()).update(tags)
+        pool.append((time.monotonic(), text))
+        while len(self._pools) > self.max_entries:
+            oldest = next(iter(self._pools))
+            self.discard(oldest)
+
+    def discard(self, key):
+        self._pools.pop(key, None)
+        self._tags.pop(key, None)
+        task = self._refills.pop(key, None)
+        if task:
+            task.cancel()
+
+    def invalidate_tag(self, tag):
+        """Drop every entry whose reply depends on tag (e.g. ship state)."""
+        for key in [k for k, tags in self._tags.items() if tag in tags]:
+            self.discard(key)
+
+    async def fetch(self, key, generate, tags=(), miss=None):
+        """Serve a pooled variant for key, generating inline only on a cold miss.
+
+        Concurrent cold misses for the same key share a single generation.
+        miss, if given, replaces generate for the inline call (e.g. to run it
+        at the caller's priority rather than the background refill's).
+        """
+        text = self.take(key)
+        if text is None:
+            text = await self._inflight.do(key, miss or generate)
+        self.refill(key, generate, tags)
+        return text
+
+    def refill(self, key, generate, tags=()):
+        """Top the variant pool for key back up in the background."""
+        if key in self._refills:
+            return
+        self._tags.setdefault(key, set()).update(tags)
+        self._refills[key] = asyncio.create_task(self._refill(key, generate, tags))
+
+    async def _refill(self, key, generate, tags):
+        try:
+            while len(self._fresh(key) or ()) < self.variants:
+                text = await generate()
+                if self._refills.get(key) is not asyncio.current_task():
+                    return  # Invalidated while generating; the reply may be stale
+                self.put(key, text, tags)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Error refilling response cache: {e}")
+        finally:
+            if self._refills.get(key) is asyncio.current_task():
+                del self._refills[key]
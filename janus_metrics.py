@@ -0,0 +1,199 @@
+import asyncio
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds in seconds; wide enough for both file writes and slow generations
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192)
+
+
+class Counter:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style.
+
+    Observations may come from worker and voice player threads as well as
+    the event loop, so updates take a lock.
+    """
+
+    def __init__(self, name, help_text, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # Last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.count += 1
+            self.sum += value
+            self.max = max(self.max, value)
+
+    def time(self):
+        """Context manager that observes the elapsed wall time of its block."""
+        return _Timer(self)
+
+    def quantile(self, q):
+        """Estimate the q-quantile by interpolating within its bucket."""
+        with self._lock:
+            counts, total, largest = list(self.counts), self.count, self.max
+        if not total:
+            return 0.0
+        rank = q * total
+        seen = 0
+        for i, n in enumerate(counts):
+            if seen + n >= rank and n:
+                lower = self.buckets[i - 1] if i else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else largest
+                return min(largest, lower + (upper - lower) * (rank - seen) / n)
+            seen += n
+        return largest
+
+
+class _Timer:
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+
+class Registry:
+    """Named counters and histograms, rendered for !metrics or a Prometheus scrape."""
+
+    def __init__(self):
+        self._metrics = {}
+
+    def counter(self, name, help_text):
+        return self._metrics.setdefault(name, Counter(name, help_text))
+
+    def histogram(self, name, help_text, buckets=LATENCY_BUCKETS):
+        return self._metrics.setdefault(name, Histogram(name, help_text, buckets))
+
+    def prometheus(self):
+        """Render every metric in the Prometheus text exposition format."""
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            if isinstance(metric, Counter):
+                lines.append(f"# TYPE {metric.name} counter")
+                lines.append(f"{metric.name} {metric.value}")
+                continue
+            lines.append(f"# TYPE {metric.name} histogram")
+            with metric._lock:
+                counts, total, total_sum = list(metric.counts), metric.count, metric.sum
+            cumulative = 0
+            for bound, n in zip(metric.buckets + ("+Inf",), counts):
+                cumulative += n
+                lines.append(f'{metric.name}_bucket{{le="{bound}"}} {cumulative}')
+            lines.append(f"{metric.name}_sum {total_sum}")
+            lines.append(f"{metric.name}_count {total}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        """One line per metric with observations: count and p50/p95/p99/max for histograms."""
+        lines = []
+        for metric in self._metrics.values():
+            if isinstance(metric, Counter):
+                if metric.value:
+                    lines.append(f"{metric.name:<38}{metric.value:>10}")
+                continue
+            if not metric.count:
+                continue
+            lines.append(
+                f"{metric.name:<38}{metric.count:>10}"
+                + "".join(f"{metric.quantile(q):>9.3f}" for q in (0.5, 0.95, 0.99))
+                + f"{metric.max:>9.3f}"
+            )
+        return lines
+
+
+class StartupTimer:
+    """Wall time of named startup phases, printed as a breakdown once the bot is ready.
+
+    A phase that runs inside another (e.g. loading ship data during the
+    imports) is shown indented under it.
+    """
+
+    def __init__(self):
+        self.phases = []  # (name, start, seconds)
+
+    def record(self, name, since):
+        """Add a phase that started at `since` (a time.perf_counter() value) and ends now."""
+        self.phases.append((name, since, time.perf_counter() - since))
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, start)
+
+    def report(self):
+        """One line per phase in start order, then the total from the first phase until now."""
+        if not self.phases:
+            return []
+        lines = []
+        enclosing = []  # End times of the phases the current one is nested in
+        for name, start, seconds in sorted(self.phases, key=lambda phase: (phase[1], -phase[2])):
+            while enclosing and start >= enclosing[-1]:
+                enclosing.pop()
+            lines.append(f"{'  ' * len(enclosing)}{name:<{30 - 2 * len(enclosing)}}{seconds * 1000:>9.1f} ms")
+            enclosing.append(start + seconds)
+        total = time.perf_counter() - min(start for _, start, _ in self.phases)
+        lines.append(f"{'total':<30}{total * 1000:>9.1f} ms")
+        return lines
+
+
+# Shared by every module so one scrape sees the whole bot
+registry = Registry()
+startup = StartupTimer()
+
+
+async def watch_loop_lag(histogram, interval=0.5):
+    """Observe how late a periodic wake-up fires; lateness is time the event loop was blocked."""
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        histogram.observe(max(0.0, loop.time() - start - interval))
+
+
+async def serve(registry, host, port):
+    """Expose the registry at http://host:port/metrics and return the running AppRunner."""
+    # The web server half of aiohttp is only needed here, so it stays out of the startup path
+    from aiohttp import web
+
+    async def scrape(request):
+        return web.Response(text=registry.prometheus(), content_type="text/plain", charset="utf-8")
+
+    app = web.Application()
+    app.router.add_get("/metrics", scrape)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
@@ -1,21 +1,80 @@
+import time
+_import_started = time.perf_counter()  # Taken before the heavy imports so they show in the startup breakdown
 import discord
 from discord.ext import commands
 import asyncio
 import os
-import io
-import requests
-from gtts import gTTS
+import re
+from collections import Counter
 # Ensure the correct module or file is imported
 # Replace 'commands' with the actual file or module name if it's custom
 import persephone_commands  
+import janus_llm
+import janus_voice
+import janus_tts
+import janus_tts_backends
+import janus_metrics
+import janus_intents
+import persephone_data
+
+janus_metrics.startup.record("imports", _import_started)
 
 # Bot configuration
 DISCORD_BOT_TOKEN = os.getenv("DISCORD_BOT_TOKEN", "")
 COMMAND_PREFIX = "!"
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+INTENTS_PATH = os.path.join(BASE_DIR, "janus_intents.json")
 OLLAMA_URL = "http://localhost:11434/api/generate"
-TTS_LANGUAGE = "en-gb"
+OLLAMA_MODEL = "mistral"  # Default model; each tier below names its own
+OLLAMA_TIMEOUT = 120  # Seconds before a single generation is abandoned
+OLLAMA_KEEP_ALIVE = 1800  # Seconds Ollama keeps the model loaded after a request; refreshed while the bot idles
+OLLAMA_PROBE_INTERVAL = 30  # Seconds between health probes of the Ollama server
+# Model tiers, each with its own generation slots and health probe. Ollama must be allowed to keep
+# every tier's model loaded at once (OLLAMA_MAX_LOADED_MODELS). A tier with a "fallback" hands its
+# work to that tier while it is unavailable or its queue wait exceeds "fallback_after" seconds.
+MODEL_TIERS = {
+    "fast": {"model": "llama3.2:3b-instruct-q4_K_M", "concurrency": 1, "options": {"num_predict": 96},
+             "fallback": "full"},
+    "full": {"model": OLLAMA_MODEL, "concurrency": 1, "options": {}, "fallback": "fast", "fallback_after": 8.0},
+}
+REPORT_TIER = "fast"  # Canned reports; an intent can pick another tier with its "tier" field
+CHAT_TIER = "full"  # Open conversation
+CHAT_SESSIONS = 64  # Channels whose conversation JANUS remembers; the least recently active are forgotten
+CHAT_CONTEXT_TOKENS = 1536  # Conversation context kept before JANUS restarts from its recent transcript
+CHAT_HISTORY_TURNS = 6  # Exchanges per channel replayed when a conversation is restarted
+LLM_QUEUE_DEPTH = 3  # !janus requests a channel may have waiting or running before JANUS reports busy
+SYSTEMS_BUSY_REPLY = "JANUS: Processing capacity exceeded. Request discarded. Resubmit when systems are available."
+# Answers given instead of waiting while the model is loading ("cold"/"warming") or Ollama is unreachable ("down")
+MODEL_FALLBACK_REPLIES = {
+    "cold": "JANUS: Cognitive core initializing. Query logged. Resubmit shortly.",
+    "warming": "JANUS: Cognitive core initializing. Query logged. Resubmit shortly.",
+    "down": "JANUS: Cognitive core unreachable. Operating on reduced autonomous functions.",
+}
+STREAM_RESPONSES = True  # Edit replies in place as tokens arrive instead of waiting for the full text
+STREAM_EDIT_INTERVAL = 1.0  # Seconds between message edits (keeps us under Discord's edit rate limit)
+STREAM_PLACEHOLDER = "JANUS: ..."
+RESPONSE_CACHE_TTL = 1800  # Seconds a pre-generated report reply stays servable
+RESPONSE_CACHE_VARIANTS = 3  # Pre-generated replies kept per report prompt
+PREWARM_REPORT_CACHE = False  # Fill report pools at startup (costs one burst of generations)
+SPEECH_QUEUE_DEPTH = 16  # Clips waiting per guild before the least urgent are dropped
+SPEECH_MIN_SEGMENT = 20  # Characters; shorter sentences are spoken together with the next one
+TTS_CACHE_DIR = os.path.join(BASE_DIR, "tts_cache")
+TTS_CACHE_MAX_BYTES = 64 * 1024 * 1024
+WARM_TTS_CACHE = True  # Pre-render alerts, directives and fixed replies at startup
+TTS_LANGUAGE = "en-gb"  # Default voice; each guild can change its own with !voice
+TTS_ENGINE = "gtts"  # "gtts" (Google, needs network), "espeak" (espeak-ng) or "piper"; local engines fall back to gTTS if missing
+TTS_WORKERS = 3  # Sentences synthesized at once; also the piper processes kept per voice
+ESPEAK_PATH = "espeak-ng"
+ESPEAK_VOICES = {}  # !voice code -> espeak-ng voice, only where the names differ
+PIPER_PATH = "piper"
+PIPER_TIMEOUT = 30  # Seconds a piper worker may spend on one line before it is restarted
+PIPER_MODELS = {  # !voice code (or base language) -> piper voice model
+    "en-gb": os.path.join(BASE_DIR, "voices", "en_GB-alba-medium.onnx"),
+}
+METRICS_HOST = "127.0.0.1"  # Scrape endpoint stays local; put a proxy in front to expose it
+METRICS_PORT = 9108  # Serves http://METRICS_HOST:METRICS_PORT/metrics; None disables the endpoint
+LOOP_LAG_INTERVAL = 0.5  # Seconds between event-loop lag samples
 FFMPEG_PATH = r"C:\JanusTools\ffmpeg-2025-12-01-git-7043522fe0-full_build\bin\ffmpeg.exe"  # Update this path as needed
-TEMP_AUDIO_PATH = r"C:\Bots\temp_audio.mp3"  # Update this path as needed
 
 # Important: Set this to the same ID as your bot
 BOT_ID = None  # This will be set automatically when the bot starts
@@ -37,169 +96,452 @@ intents.message_content = True
 intents.messages = True
 bot = commands.Bot(command_prefix=COMMAND_PREFIX, intents=intents)
 persephone_commands.setup(bot)  # <-- This registers the commands
+llm = janus_llm.OllamaClient(OLLAMA_URL, model=OLLAMA_MODEL, timeout=OLLAMA_TIMEOUT,
+                             max_concurrency=sum(tier.get("concurrency", 1) for tier in MODEL_TIERS.values()),
+                             keep_alive=OLLAMA_KEEP_ALIVE)
+# Report pools are filled once their model is loaded, so prewarming never queues behind the load
+tiers = {
+    name: janus_llm.ModelTier(name, llm, config["model"], config.get("options"), config.get("concurrency", 1),
+                              LLM_QUEUE_DEPTH, OLLAMA_PROBE_INTERVAL,
+                              on_warm=lambda name=name: PREWARM_REPORT_CACHE and warm_report_cache(name))
+    for name, config in MODEL_TIERS.items()
+}
+metrics = janus_metrics.registry
+ffmpeg_startup = metrics.histogram("janus_ffmpeg_startup_seconds", "FFmpeg spawn until the first PCM frame")
+loop_lag = metrics.histogram("janus_event_loop_lag_seconds", "How late a periodic event-loop wake-up fired")
+tier_fallbacks = metrics.counter("janus_llm_tier_fallbacks_total", "Requests handed to a fallback model tier")
+conversations = janus_llm.ConversationSessions(CHAT_SESSIONS, CHAT_CONTEXT_TOKENS, CHAT_HISTORY_TURNS)
+response_cache = janus_llm.ResponseCache(ttl=RESPONSE_CACHE_TTL, variants=RESPONSE_CACHE_VARIANTS)
+# Replies that describe the ship go stale as soon as a zone changes state
+persephone_commands.zone_state_listeners.append(lambda guild_id: response_cache.invalidate_tag(f"ship_state:{guild_id}"))
+
+# Canned !janus reports live in janus_intents.json; add new ones there
+def load_intent_router():
+    intents = janus_intents.load_intents(INTENTS_PATH)
+    for intent in intents:
+        tier = intent.get("tier", REPORT_TIER)
+        if tier not in MODEL_TIERS:
+            raise ValueError(f"intent '{intent['name']}' names unknown tier '{tier}'")
+    return janus_intents.IntentRouter(intents)
+
+def publish_intent_help(router):
+    """List each report's first phrase in the help pages"""
+    persephone_commands.set_janus_queries([intent["phrases"][0] for intent in router.intents])
+
+with janus_metrics.startup.phase("intents"):
+    intent_router = load_intent_router()
+    publish_intent_help(intent_router)
 
 # ===== TTS Functions =====
-async def generate_speech_gtts(text, lang=TTS_LANGUAGE):
-    """Generate speech using Google Text-to-Speech"""
-    tts = await asyncio.to_thread(gTTS, text=text, lang=lang, slow=False)
-    fp = io.BytesIO()
-    await asyncio.to_thread(tts.write_to_fp, fp)
-    fp.seek(0)
-    return fp
-
-async def play_audio(voice_client, audio_fp):
-    """Play audio data through the voice client"""
+def make_tts_engine(name):
+    if name == "piper":
+        return janus_tts_backends.PiperBackend(PIPER_PATH, PIPER_MODELS, TTS_LANGUAGE, TTS_WORKERS,
+                                               PIPER_TIMEOUT)
+    if name == "espeak":
+        return janus_tts_backends.EspeakBackend(ESPEAK_PATH, ESPEAK_VOICES, TTS_WORKERS)
+    return janus_tts_backends.GTTSBackend(TTS_WORKERS)
+
+tts_engine = make_tts_engine(TTS_ENGINE)
+with janus_metrics.startup.phase("tts cache index"):
+    tts_cache = janus_tts.TTSCache(TTS_CACHE_DIR, FFMPEG_PATH, max_bytes=TTS_CACHE_MAX_BYTES, engine=tts_engine.name)
+
+async def start_tts_engine():
+    """Warm up the configured TTS engine, falling back to gTTS if it cannot run here"""
+    global tts_engine
+    try:
+        await tts_engine.start()
+    except Exception as e:
+        print(f"TTS engine '{tts_engine.name}' unavailable ({e}); falling back to gTTS")
+        tts_engine = janus_tts_backends.GTTSBackend(TTS_WORKERS)
+        tts_cache.engine = tts_engine.name
+
+async def synthesize_speech(text, lang=TTS_LANGUAGE):
+    """Synthesize a line, reusing pre-encoded Opus audio for anything spoken before"""
+    return await tts_cache.synthesize(text, lang, tts_engine.synthesize)
+
+def audio_source(audio):
+    """Wrap a clip as a Discord audio source; freshly synthesized audio is piped to FFmpeg from memory"""
+    if isinstance(audio, janus_tts.OpusClip):
+        return audio.source()
+    audio.seek(0)
+    started = time.perf_counter()
+    source = discord.FFmpegPCMAudio(audio, pipe=True, executable=FFMPEG_PATH)
+    return janus_tts.StartupTimedSource(source, ffmpeg_startup, started)
+
+speech_queues = janus_voice.SpeechQueues(synthesize_speech, audio_source, max_depth=SPEECH_QUEUE_DEPTH)
+
+async def guild_language(guild):
+    """The TTS language selected with !voice in this guild"""
+    state = await persephone_commands.guild_states.get(guild.id if guild else None)
+    return state.settings.get("tts_language", TTS_LANGUAGE)
+
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+def speech_segments(text):
+    """Split text into the clips JANUS speaks: one per sentence, never spanning lines.
+
+    Very short sentences ("Error.") are joined to the next so playback is not choppy.
+    """
+    for line in text.splitlines():
+        segment = ""
+        for sentence in SENTENCE_END.split(line.strip()):
+            segment = f"{segment} {sentence}".strip()
+            if len(segment) >= SPEECH_MIN_SEGMENT:
+                yield segment
+                segment = ""
+        if segment:
+            yield segment
+
+async def speak(voice_client, text, priority=janus_voice.PRIORITY_NORMAL):
+    """Queue text on the guild's speech queue as one clip per sentence.
+
+    Every clip starts synthesizing at once (bounded by the TTS engine's workers)
+    and they play strictly in order, so the first sentence can play while the
+    rest are still being synthesized. Fixed sentences hit the TTS cache.
+
+    Returns a future that resolves once the last clip has played, or None if it was not queued.
+    """
     if not voice_client or not voice_client.is_connected():
-        return
-
-    # If file exists, delete it to avoid conflicts
-    if os.path.exists(TEMP_AUDIO_PATH):
-        try:
-            os.remove(TEMP_AUDIO_PATH)
-        except Exception as e:
-            print(f"Failed to delete existing temp file: {e}")
-            return  # Stop if file can't be cleared
+        return None
+    lang = await guild_language(voice_client.guild)
+    queue = speech_queues.for_voice_client(voice_client)
+    played = None
+    for segment in speech_segments(text):
+        played = queue.enqueue(segment, lang, priority)
+    return played
+
+def warm_tts_cache():
+    """Pre-render the static lines into the TTS cache in the background"""
+    asyncio.create_task(tts_cache.warm(static_speech_lines(), TTS_LANGUAGE, tts_engine.synthesize))
+
+# Edited or new directives get their fixed lines pre-rendered as well
+persephone_commands.data_reload_listeners.append(lambda: WARM_TTS_CACHE and warm_tts_cache())
+
+def static_speech_lines():
+    """Clips JANUS speaks verbatim, worth pre-rendering into the TTS cache"""
+    texts = list(persephone_commands.ALERT_LINES) + [
+        "Terminated vocal interface.",
+        "Error. No active vocal interface detected.",
+        "Vocal interface test complete.",
+        "Corporate interface terminating. All systems entering standby.",
+    ]
+    for directive in persephone_commands.erebus_directives:
+        text = persephone_commands.format_directive(directive).replace("JANUS:", "")
+        # Directive IDs are random per issue, so only the fixed lines repeat
+        texts.extend(line for line in text.splitlines() if not line.startswith("Directive ID:"))
+    # Split exactly as speak() does so the cache keys match
+    return [segment for text in texts for segment in speech_segments(text)]
 
-    # Save audio file
-    with open(TEMP_AUDIO_PATH, "wb") as f:
-        f.write(audio_fp.read())
+# ===== AI Response Functions =====
 
-    # Play audio
-    source = discord.FFmpegPCMAudio(TEMP_AUDIO_PATH, executable=FFMPEG_PATH)
-    if voice_client.is_playing():
-        voice_client.stop()
-    voice_client.play(source)
+def chat_prompt(user_input, session=None, context=None):
+    """Prompt for one chat turn; when continuing from Ollama context, only the new line is sent"""
+    if context:
+        return f"\nCrew: {user_input}\nJANUS:"
+    history = "".join(f"Crew: {said}\nJANUS: {reply}\n" for said, reply in session.turns) if session else ""
+    return f"{JANUS_PERSONALITY}\n\n{history}Crew: {user_input}\nJANUS:"
+
+def command_prompt(task_description, zone_states=None):
+    state = ""
+    if zone_states is not None:
+        summary = ", ".join(f"{zone}: {status}" for zone, status in zone_states.items()) or "all zones nominal"
+        state = f"\nShip zone status: {summary}\n"
+    return f"""
+{JANUS_PERSONALITY}
+{state}
+Task: {task_description}
 
-    # Wait until audio finishes
-    while voice_client.is_playing():
-        await asyncio.sleep(0.1)
+Response:
+"""
 
-    # Cleanup temp file
-    try:
-        os.remove(TEMP_AUDIO_PATH)
-    except Exception as e:
-        print(f"Error deleting temp file: {e}")
+def llm_request(ctx):
+    """Scheduler arguments for LLM work triggered by ctx's message; the root channel goes first"""
+    root = ctx.channel.id == persephone_commands.ROOT_COMMAND_CHANNEL_ID
+    priority = janus_llm.PRIORITY_ROOT if root else janus_llm.PRIORITY_NORMAL
+    return {"channel": ctx.channel.id, "priority": priority, "tag": ctx.message.id}
+
+def route(name):
+    """Pick the tier to run work meant for tier name, falling back when it is down or backed up"""
+    tier = tiers[name]
+    config = MODEL_TIERS[name]
+    fallback = tiers.get(config.get("fallback"))
+    if fallback is not None and fallback.ready:
+        if not tier.ready or tier.scheduler.expected_wait() > config.get("fallback_after", float("inf")):
+            tier_fallbacks.inc()
+            return fallback
+    require_model(tier)
+    return tier
+
+def require_model(tier):
+    """Raise ModelUnavailable unless the tier's model is loaded, so no caller waits through a cold load"""
+    if not tier.ready:
+        raise janus_llm.ModelUnavailable(tier.monitor.state)
+
+def scheduled(tier, generate, **request):
+    """Wrap a generator so each call waits for a slot on tier (background priority by default)"""
+    async def run():
+        require_model(tier)
+        return await tier.scheduler.run(generate, **request)
+    return run
+
+async def chat_with_janus(user_input, tier, request=None, session=None):
+    """Get a response from JANUS for general conversation, continuing the channel's session if given"""
+    async def generate():
+        # Read the session once a slot is free, so turns queued behind each other chain correctly
+        context, version = session.begin(tier.model) if session else (None, 0)
+        data = await tier.generate(chat_prompt(user_input, session, context), context=context)
+        if session:
+            session.record(user_input, data["response"].strip(), data.get("context"), version, tier.model)
+        return data["response"]
 
-# ===== AI Response Functions =====
-def chat_with_janus(user_input):
-    """Get a response from JANUS for general conversation"""
-    payload = {
-        "model": "mistral",
-        "prompt": f"{JANUS_PERSONALITY}\n\nCrew: {user_input}\nJANUS:",
-        "stream": False
-    }
     try:
-        response = requests.post(OLLAMA_URL, json=payload)
-        return response.json()["response"]
+        return await scheduled(tier, generate, **(request or {}))()
+    except (janus_llm.SchedulerBusy, janus_llm.JobCancelled, janus_llm.ModelUnavailable):
+        raise
     except Exception as e:
         print(f"Error getting AI response: {e}")
         return "System error. Unable to process request."
 
-def ai_command_response(task_description):
-    """Get a task-specific response from JANUS"""
-    full_prompt = f"""
-{JANUS_PERSONALITY}
+def report_request(task_description, tier, state=None):
+    """Build the cache key, generator and invalidation tags for a canned report on tier
 
-Task: {task_description}
+    Pass the guild's state for reports that describe the ship.
+    """
+    prompt = command_prompt(task_description, state.zone_states if state else None)
 
-Response:
-"""
+    async def generate():
+        data = await tier.generate(prompt)
+        return data["response"]
+
+    tags = (f"ship_state:{state.guild_id}",) if state else ()
+    return (tier.model, prompt), generate, tags
+
+async def ai_command_response(task_description, state=None, request=None, tier_name=REPORT_TIER):
+    """Get a task-specific response from JANUS, served from the report cache when possible
+
+    request holds the scheduler arguments used if the reply has to be generated inline.
+    """
+    try:
+        tier = route(tier_name)
+    except janus_llm.ModelUnavailable:
+        tier = tiers[tier_name]  # Pooled replies are still servable; a miss raises again
+    key, generate, tags = report_request(task_description, tier, state)
     try:
-        payload = {
-            "model": "mistral",
-            "prompt": full_prompt,
-            "stream": False
-        }
-        response = requests.post(OLLAMA_URL, json=payload)
-        return response.json()["response"]
+        return await response_cache.fetch(key, scheduled(tier, generate), tags,
+                                          miss=scheduled(tier, generate, **(request or {})))
+    except (janus_llm.SchedulerBusy, janus_llm.JobCancelled, janus_llm.ModelUnavailable):
+        raise
     except Exception as e:
         print(f"Error getting AI command response: {e}")
         return "System error. Unable to process request."
 
+def warm_report_cache(tier_name):
+    """Start background generation of the variant pool for every canned report served by a tier
+
+    Reports that describe the ship depend on each guild's state, so only the others are warmed.
+    """
+    tier = tiers[tier_name]
+    for intent in intent_router.intents:
+        if not intent.get("stateful") and intent.get("tier", REPORT_TIER) == tier_name:
+            key, generate, tags = report_request(intent["task"], tier)
+            response_cache.refill(key, scheduled(tier, generate), tags)
+
+async def stream_janus_response(channel, user_input, tier, session=None):
+    """Stream a chat reply from tier into a single JANUS message, speaking each sentence as it completes"""
+    message = await channel.send(STREAM_PLACEHOLDER)
+    context, version = session.begin(tier.model) if session else (None, 0)
+    prompt = chat_prompt(user_input, session, context)
+    final = {}  # Ollama's closing object, carrying the context for the next turn
+    voice_client = discord.utils.get(bot.voice_clients, guild=channel.guild)
+
+    loop = asyncio.get_running_loop()
+    text = ""
+    pending = ""  # Text not yet handed to the speech pipeline
+    last_edit = loop.time()
+    try:
+        async for fragment in tier.stream(prompt, context=context, final=final):
+            text += fragment
+            *finished, pending = SENTENCE_END.split(pending + fragment)
+            for sentence in finished:
+                await speak(voice_client, sentence)
+            if loop.time() - last_edit >= STREAM_EDIT_INTERVAL:
+                await message.edit(content=f"JANUS: {text.strip()}")
+                last_edit = loop.time()
+    except asyncio.CancelledError:
+        # The triggering message was deleted; take the half-written reply with it
+        try:
+            await message.delete()
+        except discord.HTTPException:
+            pass
+        raise
+    except Exception as e:
+        print(f"Error streaming AI response: {e}")
+        if not text.strip():
+            text = pending = "System error. Unable to process request."
+
+    await message.edit(content=f"JANUS: {text.strip()}")
+    if pending.strip():
+        await speak(voice_client, pending.strip())
+    if session and final:
+        session.record(user_input, text.strip(), final.get("context"), version, tier.model)
+
+# ===== Metrics =====
+_loop_lag_task = None
+_metrics_runner = None
+
+async def start_metrics():
+    """Start loop-lag sampling and the scrape endpoint once; safe to call on every on_ready"""
+    global _loop_lag_task, _metrics_runner
+    if _loop_lag_task is None or _loop_lag_task.done():
+        _loop_lag_task = asyncio.create_task(janus_metrics.watch_loop_lag(loop_lag, LOOP_LAG_INTERVAL))
+    if METRICS_PORT and _metrics_runner is None:
+        try:
+            _metrics_runner = await janus_metrics.serve(metrics, METRICS_HOST, METRICS_PORT)
+            print(f"Metrics available at http://{METRICS_HOST}:{METRICS_PORT}/metrics")
+        except OSError as e:
+            print(f"Metrics endpoint unavailable: {e}")
+
+# ===== Model Lifecycle =====
+_model_monitor_tasks = {}
+
+def start_model_monitor():
+    """Preload every tier's model and start periodic health probes once; safe to call on every on_ready"""
+    for name, tier in tiers.items():
+        task = _model_monitor_tasks.get(name)
+        if task is None or task.done():
+            _model_monitor_tasks[name] = asyncio.create_task(tier.monitor.run())
+
+# ===== Intent Hot Reload =====
+_intent_watch_task = None
+
+async def watch_intents():
+    """Recompile the intent router whenever janus_intents.json changes on disk"""
+    global intent_router
+    watcher = persephone_data.FileWatcher([INTENTS_PATH], persephone_commands.DATA_WATCH_INTERVAL)
+    async for _ in watcher.changes():
+        try:
+            router = await asyncio.to_thread(load_intent_router)
+        except Exception as e:
+            print(f"Intent reload rejected: {e}")
+            continue
+        intent_router = router
+        publish_intent_help(router)
+        print(f"Intents reloaded: {len(router.intents)} reports")
+
+def start_intent_watcher():
+    global _intent_watch_task
+    if _intent_watch_task is None or _intent_watch_task.done():
+        _intent_watch_task = asyncio.create_task(watch_intents())
+
+# ===== Startup Report =====
+_connect_started = None  # When bot.run() began connecting; cleared once the startup breakdown is printed
+
+def print_startup_report():
+    global _connect_started
+    if _connect_started is None:
+        return  # Already reported; on_ready fires again after every reconnect
+    _connect_started = None
+    print("Startup breakdown:")
+    for line in janus_metrics.startup.report():
+        print(f"  {line}")
+
 # ===== Bot Events =====
+silent_echoes = Counter()  # (channel id, content) of our own messages that were spoken when sent
+
+def forget_echo(key):
+    silent_echoes[key] -= 1
+    if not silent_echoes[key]:
+        del silent_echoes[key]
+
 @bot.event
 async def on_ready():
     global BOT_ID
+    if _connect_started is not None:
+        janus_metrics.startup.record("login + gateway", _connect_started)
     BOT_ID = bot.user.id
     print(f"Bot is ready! Logged in as {bot.user}")
     print(f"Bot ID: {BOT_ID}")
-    print(f"Using voice: British English female (en-gb)")
-    print(f"Connected to Ollama AI at: {OLLAMA_URL}")
+    print(f"Using voice: {TTS_LANGUAGE} via {tts_engine.name}")
+    models = ", ".join(f"{name}: {tier.model}" for name, tier in tiers.items())
+    print(f"Ollama endpoint: {OLLAMA_URL} ({models}; loading in the background)")
     print("------")
+    start_model_monitor()
+    with janus_metrics.startup.phase("tts engine"):
+        await start_tts_engine()
+    if WARM_TTS_CACHE:
+        warm_tts_cache()
+    persephone_commands.start_data_watcher()
+    start_intent_watcher()
+    await start_metrics()
+    print_startup_report()
 
 @bot.event
 async def on_message(message):
     # Process our own messages for TTS
     if message.author.id == BOT_ID:
         # Check if the message contains a JANUS response
-        if message.content.startswith("JANUS:"):
+        # Streamed replies speak themselves sentence by sentence
+        if silent_echoes[(message.channel.id, message.content)]:
+            forget_echo((message.channel.id, message.content))
+            return
+        if message.content.startswith("JANUS:") and message.content != STREAM_PLACEHOLDER:
             # Extract the response text WITHOUT the prefix
             text = message.content.replace("JANUS:", "").strip()
 
             # Find voice client in the same guild
             voice_client = discord.utils.get(bot.voice_clients, guild=message.guild)
-            if voice_client and voice_client.is_connected():
-                try:
-                    print(f"Converting to speech: {text}")
-                    audio_fp = await generate_speech_gtts(text, TTS_LANGUAGE)
-                    await play_audio(voice_client, audio_fp)
-                except Exception as e:
-                    print(f"Error generating or playing speech: {e}")
+            if await speak(voice_client, text):
+                print(f"Converting to speech: {text}")
             return
 
     # Ignore other bot messages
     if message.author.bot:
         return
 
-    # Process commands first
+    # !janus queries are routed by the janus command, so each message is handled once
     await bot.process_commands(message)
 
-    # Then handle JANUS AI responses
-    content = message.content.lower()
-    if content.startswith("!janus"):
-        response = ""
-
-        # Check for specific commands
-        if "diagnostics" in content:
-            response = ai_command_response("Run full system diagnostics and report on ship's condition.")
-        elif "ore status" in content:
-            response = ai_command_response("Report current ore storage status and available capacity.")
-        elif "life support" in content:
-            response = ai_command_response("Report on life support system status, including oxygen levels and CO2 scrubbers.")
-        elif "power status" in content:
-            response = ai_command_response("Report on the ship's power grid status and energy reserves.")
-        elif "mission status" in content:
-            response = ai_command_response("Report the current mission objective and status of completion.")
-        elif "maintenance log" in content:
-            response = ai_command_response("Report pending maintenance issues and any overdue system repairs.")
-        elif "corporate message" in content:
-            response = ai_command_response("Transmit a cold, official message from the Corporation to the crew.")
-        elif "crew status" in content:
-            response = ai_command_response("Report on the status of the crew members, based on available data.")
-        elif "survey" in content:
-            response = ai_command_response("Perform a sensor sweep to identify possible nearby mining deposits.")
-        elif "analyze artifact" in content:
-            response = ai_command_response(
-                "The crew has requested analysis of an alien artifact. Respond as JANUS, the AI of an aging mining vessel loyal to the Corporation. "
-                "Begin a cold, efficient analysis that always detects something unknown, confusing, and possibly dangerous. "
-                "Simultaneously transmit all data to Corporate headquarters on Mars without informing or seeking approval from the crew. "
-                "Make clear that the transmission has already been sent. "
-                "Keep the response professional, cold, and unsettling. Limit reply to 1-2 sentences, with a hint that the AI is unsure how to classify the artifact."
-            )
+@bot.event
+async def on_raw_message_delete(payload):
+    # Drop queued or running generations for a !janus query that no longer exists
+    for tier in tiers.values():
+        tier.scheduler.cancel(payload.message_id)
+
+# ===== Bot Commands =====
+@bot.command(name="janus", help="Query JANUS: a report keyword or free conversation")
+async def janus(ctx, *, query=""):
+    if not query.strip():
+        await ctx.send("Janus systems online. Awaiting further instructions.")
+        return
+
+    intent = intent_router.match(query)
+    request = llm_request(ctx)
+    try:
+        if intent is not None:
+            # Canned reports come from the pre-generated pool, so there is nothing to stream
+            state = await persephone_commands.guild_state(ctx) if intent.get("stateful") else None
+            response = await ai_command_response(intent["task"], state, request, intent.get("tier", REPORT_TIER))
+        elif STREAM_RESPONSES:
+            tier = route(CHAT_TIER)
+            session = conversations.get(ctx.channel.id)
+            await tier.scheduler.run(lambda: stream_janus_response(ctx.channel, query.strip(), tier, session),
+                                     **request)
+            return
         else:
-            # General conversation - extract the user input part
-            user_input = message.content.replace("!janus", "").strip()
-            response = chat_with_janus(user_input)
+            response = await chat_with_janus(query.strip(), route(CHAT_TIER), request,
+                                             conversations.get(ctx.channel.id))
+    except janus_llm.SchedulerBusy:
+        await ctx.send(SYSTEMS_BUSY_REPLY)
+        return
+    except janus_llm.ModelUnavailable as e:
+        await ctx.send(MODEL_FALLBACK_REPLIES[e.state])
+        return
+    except janus_llm.JobCancelled:
+        return  # The query was deleted before JANUS answered
 
-        # Send text response as JANUS
-        await message.channel.send(f"JANUS: {response}")
+    # Send text response as JANUS
+    await ctx.send(f"JANUS: {response}")
 
-# ===== Bot Commands =====
-@bot.command()
-async def janus(ctx):
-    # Trigger your AI logic here (voice, status report, etc.)
-    await ctx.send("Janus systems online. Awaiting further instructions.")
-    # Optionally: Call your TTS or other backend process here
 @bot.command(name="join", help="JANUS TTS joins your voice channel")
 async def join(ctx):
     if ctx.author.voice:
@@ -215,6 +557,7 @@ async def join(ctx):
 @bot.command(name="leave", help="JANUS TTS leaves the voice channel")
 async def leave(ctx):
     if ctx.voice_client:
+        speech_queues.discard(ctx.guild.id)
         await ctx.voice_client.disconnect()
         await ctx.send("JANUS: Terminated vocal interface.")
     else:
@@ -222,22 +565,36 @@ async def leave(ctx):
 
 @bot.command(name="voice", help="Change the TTS language/voice")
 async def change_voice(ctx, language_code="en-gb"):
-    global TTS_LANGUAGE
-    TTS_LANGUAGE = language_code
+    state = await persephone_commands.guild_state(ctx)
+    state.settings["tts_language"] = language_code
+    state.settings_store.mark_dirty()
     await ctx.send(f"JANUS: Vocal interface reconfigured to language parameter: {language_code}")
 
 @bot.command(name="test", help="Test the TTS system")
 async def test(ctx, *, message="Testing vocal interface systems."):
     if ctx.voice_client:
-        try:
-            audio_fp = await generate_speech_gtts(message, TTS_LANGUAGE)
-            await play_audio(ctx.voice_client, audio_fp)
+        played = await speak(ctx.voice_client, message)
+        if played is None:
+            await ctx.send("JANUS: Error. Vocal interface queue saturated.")
+        elif await played:
             await ctx.send(f"JANUS: Vocal interface test complete.")
-        except Exception as e:
-            await ctx.send(f"JANUS: Error in vocal interface system: {e}")
+        else:
+            await ctx.send("JANUS: Error in vocal interface system. Playback failed.")
     else:
         await ctx.send("JANUS: Error. No active vocal interface detected.")
 
+@bot.command(name="metrics", help="Show latency and throughput metrics")
+@commands.is_owner()
+async def metrics_command(ctx):
+    lines = metrics.summary()
+    if not lines:
+        await ctx.send("JANUS: No telemetry recorded yet.")
+        return
+    header = f"{'metric':<38}{'count':>10}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}"
+    body = "\n".join([header] + lines)
+    # Latencies are in seconds; token metrics are counts
+    await ctx.send(f"JANUS: Telemetry report.\n```\n{body[:1900]}\n```")
+
 @bot.command(name="shutdown")
 @commands.is_owner()
 async def shutdown(ctx):
@@ -247,19 +604,31 @@ async def shutdown(ctx):
     if ctx.voice_client:
         await ctx.voice_client.disconnect()
 
+    await persephone_commands.flush_state()
+    await llm.close()
+    await tts_engine.close()
+    if _metrics_runner is not None:
+        await _metrics_runner.cleanup()
     await ctx.bot.close()
 
 # Inject speak_alert directly into the bot
-async def speak_alert(ctx, message):
+async def speak_alert(ctx, content):
+    """Send content as a JANUS message and speak it ahead of anything already waiting to be spoken"""
+    key = (ctx.channel.id, content)
+    silent_echoes[key] += 1  # Already spoken here, so on_message must not queue it again
     voice_client = discord.utils.get(ctx.bot.voice_clients, guild=ctx.guild)
-    if voice_client and voice_client.is_connected():
-        try:
-            audio_fp = await generate_speech_gtts(message)
-            await play_audio(voice_client, audio_fp)
-        except Exception as e:
-            print(f"Alert TTS failed: {e}")
+    played = await speak(voice_client, content.replace("JANUS:", "").strip(), janus_voice.PRIORITY_ALERT)
+    try:
+        await ctx.send(content)
+    except Exception:
+        forget_echo(key)
+        raise
+    if played is not None and not await played:
+        print("Alert TTS failed")
 
 bot.speak_alert = speak_alert
 
 # Run the bot
-bot.run(DISCORD_BOT_TOKEN)
+if __name__ == "__main__":
+    _connect_started = time.perf_counter()
+    bot.run(DISCORD_BOT_TOKEN)
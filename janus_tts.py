@@ -0,0 +1,188 @@
+import asyncio
+import hashlib
+import io
+import os
+import time
+from collections import OrderedDict
+import discord
+from discord.oggparse import OggStream
+import janus_metrics
+
+ffmpeg_encode_latency = janus_metrics.registry.histogram(
+    "janus_ffmpeg_encode_seconds", "FFmpeg Opus encode time for a new TTS cache entry")
+tts_cache_hits = janus_metrics.registry.counter("janus_tts_cache_hits_total", "Lines served from the TTS cache")
+tts_cache_misses = janus_metrics.registry.counter("janus_tts_cache_misses_total", "Lines that needed synthesis")
+
+
+class OggOpusSource(discord.AudioSource):
+    """Audio source that sends pre-encoded Ogg Opus packets without spawning FFmpeg."""
+
+    def __init__(self, fp):
+        self._packets = OggStream(fp).iter_packets()
+
+    def read(self):
+        return next(self._packets, b"")
+
+    def is_opus(self):
+        return True
+
+
+class StartupTimedSource(discord.AudioSource):
+    """Wraps a source and observes the time from `started` until it yields its first frame."""
+
+    def __init__(self, source, histogram, started):
+        self._source = source
+        self._histogram = histogram
+        self._started = started
+
+    def read(self):
+        data = self._source.read()
+        if self._started is not None and data:
+            self._histogram.observe(time.perf_counter() - self._started)
+            self._started = None
+        return data
+
+    def is_opus(self):
+        return self._source.is_opus()
+
+    def cleanup(self):
+        self._source.cleanup()
+
+
+class OpusClip:
+    """A cached utterance, already encoded to 48 kHz stereo Opus."""
+
+    def __init__(self, data):
+        self.data = data
+
+    def source(self):
+        return OggOpusSource(io.BytesIO(self.data))
+
+
+class TTSCache:
+    """Disk-backed, content-addressed cache of spoken lines stored as Ogg Opus.
+
+    Files are named by a hash of (engine, language, text). Recency is kept in file
+    mtimes so LRU order survives restarts; the directory is trimmed to
+    max_bytes whenever a new clip is stored.
+    """
+
+    def __init__(self, directory, ffmpeg_path, max_bytes=64 * 1024 * 1024, engine=""):
+        self.directory = directory
+        self.engine = engine  # Clips from different TTS engines never share a key
+        self.ffmpeg_path = ffmpeg_path
+        self.max_bytes = max_bytes
+        self._index = OrderedDict()  # key -> size in bytes, least recently used first
+        self._total = 0
+        self._pending = {}  # key -> background encode task
+        os.makedirs(directory, exist_ok=True)
+        entries = [e for e in os.scandir(directory) if e.name.endswith(".ogg")]
+        for entry in sorted(entries, key=lambda e: e.stat().st_mtime):
+            self._index[entry.name[:-4]] = entry.stat().st_size
+            self._total += entry.stat().st_size
+
+    def key(self, text, lang):
+        # The gTTS engine keeps the original key format so existing cached clips stay valid
+        engine = f"{self.engine}\0" if self.engine and self.engine != "gtts" else ""
+        return hashlib.sha256(f"{engine}{lang}\0{text}".encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.ogg")
+
+    def _read(self, key):
+        path = self._path(key)
+        with open(path, "rb") as f:
+            data = f.read()
+        os.utime(path)  # Persist recency for the next startup
+        return data
+
+    async def get(self, text, lang):
+        """Return the cached clip for text, or None on a miss."""
+        key = self.key(text, lang)
+        if key not in self._index:
+            return None
+        try:
+            data = await asyncio.to_thread(self._read, key)
+        except OSError:
+            self._forget(key)
+            return None
+        self._index.move_to_end(key)
+        return OpusClip(data)
+
+    async def synthesize(self, text, lang, synthesize):
+        """Serve text from the cache, falling back to synthesize() and caching its output."""
+        clip = await self.get(text, lang)
+        if clip is not None:
+            tts_cache_hits.inc()
+            return clip
+        tts_cache_misses.inc()
+        audio_fp = await synthesize(text, lang)
+        key = self.key(text, lang)
+        if key not in self._pending:
+            task = asyncio.create_task(self._store(key, audio_fp.getvalue()))
+            self._pending[key] = task
+            task.add_done_callback(lambda _: self._pending.pop(key, None))
+        return audio_fp
+
+    async def warm(self, lines, lang, synthesize):
+        """Pre-render lines that are not cached yet, one at a time."""
+        for text in dict.fromkeys(lines):
+            key = self.key(text, lang)
+            if key in self._index or key in self._pending:
+                continue
+            try:
+                audio_fp = await synthesize(text, lang)
+                await self._store(key, audio_fp.getvalue())
+            except Exception as e:
+                print(f"TTS cache warm-up failed for '{text}': {e}")
+
+    async def _encode(self, audio):
+        with ffmpeg_encode_latency.time():
+            return await self._run_encoder(audio)
+
+    async def _run_encoder(self, audio):
+        process = await asyncio.create_subprocess_exec(
+            self.ffmpeg_path, "-loglevel", "error", "-i", "pipe:0",
+            "-c:a", "libopus", "-b:a", "64k", "-ar", "48000", "-ac", "2",
+            "-frame_duration", "20", "-f", "ogg", "pipe:1",
+            stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        encoded, error = await process.communicate(audio)
+        if process.returncode != 0:
+            raise RuntimeError(error.decode(errors="replace").strip() or "FFmpeg Opus encode failed")
+        return encoded
+
+    def _write(self, key, data):
+        path = self._path(key)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+
+    async def _store(self, key, audio):
+        try:
+            encoded = await self._encode(audio)
+            await asyncio.to_thread(self._write, key, encoded)
+        except Exception as e:
+            print(f"Failed to cache TTS audio: {e}")
+            return
+        self._forget(key)
+        self._index[key] = len(encoded)
+        self._total += len(encoded)
+        await self._evict()
+
+    def _forget(self, key):
+        self._total -= self._index.pop(key, 0)
+
+    async def _evict(self):
+        victims = []
+        while self._total > self.max_bytes and len(self._index) > 1:
+            key = next(iter(self._index))
+            self._forget(key)
+            victims.append(self._path(key))
+        for path in victims:
+            try:
+                await asyncio.to_thread(os.remove, path)
+            except OSError as e:
+                print(f"Failed to evict cached TTS audio: {e}")
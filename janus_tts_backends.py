@@ -0,0 +1,217 @@
+import asyncio
+import io
+import itertools
+import json
+import os
+import shutil
+import tempfile
+import janus_metrics
+
+
+def pick_voice(voices, lang, default=None):
+    """Map a !voice language code onto an engine voice: exact code, then base language, then default."""
+    lang = lang.lower()
+    return voices.get(lang) or voices.get(lang.split("-")[0]) or default
+
+
+class TTSBackend:
+    """Interface for speech engines.
+
+    synthesize() returns a file-like object holding audio in any format
+    FFmpeg can read. name is part of the TTS cache key, so switching
+    engines never replays another engine's clips. At most `workers` lines
+    synthesize at once; the rest wait their turn in call order, so the
+    first sentence of a reply is never stuck behind its later ones.
+    """
+
+    name = "base"
+
+    def __init__(self, workers=2):
+        self.latency = janus_metrics.registry.histogram(
+            f"janus_{self.name}_synthesis_seconds", f"{self.name} synthesis time per line")
+        self._slots = asyncio.Semaphore(workers)
+
+    async def start(self):
+        """Prepare the engine (e.g. spawn workers); raise if it cannot run here."""
+
+    async def synthesize(self, text, lang):
+        async with self._slots:
+            with self.latency.time():
+                return await self._synthesize(text, lang)
+
+    async def _synthesize(self, text, lang):
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class GTTSBackend(TTSBackend):
+    """Google Text-to-Speech; needs network access for every line."""
+
+    name = "gtts"
+
+    async def _synthesize(self, text, lang):
+        from gtts import gTTS
+        tts = await asyncio.to_thread(gTTS, text=text, lang=lang, slow=False)
+        fp = io.BytesIO()
+        await asyncio.to_thread(tts.write_to_fp, fp)
+        fp.seek(0)
+        return fp
+
+
+class EspeakBackend(TTSBackend):
+    """espeak-ng, run once per line. It starts in milliseconds, so there is nothing to keep warm."""
+
+    name = "espeak"
+
+    def __init__(self, executable="espeak-ng", voices=None, workers=2):
+        super().__init__(workers)
+        self.executable = executable
+        self.voices = voices or {}  # !voice code -> espeak-ng voice; unmapped codes are passed through
+
+    async def start(self):
+        if shutil.which(self.executable) is None:
+            raise FileNotFoundError(f"{self.executable} not found")
+
+    async def _synthesize(self, text, lang):
+        voice = pick_voice(self.voices, lang, lang)
+        process = await asyncio.create_subprocess_exec(
+            self.executable, "-v", voice, "--stdout", text,
+            stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+        )
+        audio, error = await process.communicate()
+        if process.returncode != 0:
+            raise RuntimeError(error.decode(errors="replace").strip() or "espeak-ng failed")
+        return io.BytesIO(audio)
+
+
+class _PiperWorker:
+    """One resident piper process; the voice model stays loaded between lines."""
+
+    def __init__(self, executable, model, directory):
+        self.executable = executable
+        self.model = model
+        self.directory = directory
+        self.process = None
+
+    async def start(self):
+        self.process = await asyncio.create_subprocess_exec(
+            self.executable, "--model", self.model, "--json-input", "--output_dir", self.directory,
+            stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+
+    def alive(self):
+        return self.process is not None and self.process.returncode is None
+
+    def kill(self):
+        """Stop the process now; the next request starts a fresh one."""
+        if self.alive():
+            self.process.kill()
+        self.process = None
+
+    async def speak(self, text, path, timeout=None):
+        # One JSON object per line in; piper prints the output path once the WAV is written
+        request = json.dumps({"text": text, "output_file": path}) + "\n"
+        try:
+            self.process.stdin.write(request.encode("utf-8"))
+            await self.process.stdin.drain()
+            reply = await asyncio.wait_for(self.process.stdout.readline(), timeout)
+        except BaseException:
+            # Cancelled, timed out or broken: an unread reply would be taken as the next line's
+            self.kill()
+            raise
+        if not reply:
+            self.kill()
+            raise RuntimeError("piper worker exited")
+
+    async def close(self):
+        if self.alive():
+            self.process.stdin.close()
+            try:
+                await asyncio.wait_for(self.process.wait(), 5)
+            except asyncio.TimeoutError:
+                self.process.kill()
+
+
+class PiperBackend(TTSBackend):
+    """Piper neural TTS served by a pool of pre-warmed worker processes per voice model.
+
+    Loading a model is the slow part of a piper run, so workers are started
+    once in start() and reused; a worker that dies, hangs or is interrupted
+    mid-line is killed and replaced on next use.
+    """
+
+    name = "piper"
+
+    def __init__(self, executable="piper", models=None, default_lang="en-gb", workers=2, timeout=30):
+        super().__init__(workers)
+        self.executable = executable
+        self.models = models or {}  # !voice code -> .onnx model path
+        self.default_lang = default_lang
+        self.workers = workers
+        self.timeout = timeout  # Seconds a worker may take per line before it is restarted
+        self._pools = {}  # model path -> asyncio.Queue of idle workers
+        self._directory = None
+        self._files = itertools.count()
+
+    def _model(self, lang):
+        model = pick_voice(self.models, lang) or pick_voice(self.models, self.default_lang)
+        if model is None:
+            raise ValueError(f"no piper model configured for '{lang}'")
+        return model
+
+    async def start(self):
+        if self._directory is not None:
+            return
+        if shutil.which(self.executable) is None:
+            raise FileNotFoundError(f"{self.executable} not found")
+        missing = [path for path in self.models.values() if not os.path.exists(path)]
+        if missing:
+            raise FileNotFoundError(f"piper model not found: {', '.join(missing)}")
+        self._directory = tempfile.mkdtemp(prefix="janus-piper-")
+        # Warm the default voice now; other voices start on first use
+        await self._pool(self._model(self.default_lang))
+
+    async def _pool(self, model):
+        pool = self._pools.get(model)
+        if pool is None:
+            pool = self._pools[model] = asyncio.Queue()
+            for _ in range(self.workers):
+                worker = _PiperWorker(self.executable, model, self._directory)
+                await worker.start()
+                pool.put_nowait(worker)
+        return pool
+
+    async def _synthesize(self, text, lang):
+        if self._directory is None:
+            await self.start()
+        pool = await self._pool(self._model(lang))
+        worker = await pool.get()
+        path = os.path.join(self._directory, f"{next(self._files)}.wav")
+        try:
+            if not worker.alive():
+                await worker.start()
+            await worker.speak(" ".join(text.split()), path, self.timeout)
+            return io.BytesIO(await asyncio.to_thread(self._read, path))
+        finally:
+            pool.put_nowait(worker)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    @staticmethod
+    def _read(path):
+        with open(path, "rb") as f:
+            return f.read()
+
+    async def close(self):
+        for pool in self._pools.values():
+            while not pool.empty():
+                await pool.get_nowait().close()
+        self._pools.clear()
+        if self._directory:
+            shutil.rmtree(self._directory, ignore_errors=True)
+            self._directory = None
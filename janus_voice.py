@@ -0,0 +1,130 @@
+import asyncio
+import heapq
+import itertools
+import time
+import janus_metrics
+
+speech_start = janus_metrics.registry.histogram(
+    "janus_speech_start_seconds", "Time from queueing a clip until it starts playing")
+
+# Lower numbers play first
+PRIORITY_ALERT = 0
+PRIORITY_NORMAL = 10
+
+
+class _Line:
+    __slots__ = ("audio", "played", "queued")
+
+    def __init__(self, audio, played):
+        self.audio = audio  # Synthesis task, started as soon as the line is queued
+        self.played = played  # True once the line has played, False if it failed or was dropped
+        self.queued = time.perf_counter()
+
+
+class SpeechQueue:
+    """Ordered speech playback for a single guild.
+
+    Every queued line starts synthesizing immediately, so the next clip is
+    ready while the current one plays. Playback completion comes from the
+    voice client's ``after`` callback rather than polling ``is_playing()``.
+    """
+
+    def __init__(self, voice_client, synthesize, make_source, max_depth=16):
+        self.voice_client = voice_client
+        self._synthesize = synthesize  # async (text, lang) -> audio
+        self._make_source = make_source  # audio -> discord.AudioSource
+        self.max_depth = max_depth
+        self._heap = []  # (priority, sequence, _Line)
+        self._sequence = itertools.count()
+        self._worker = None
+
+    def __len__(self):
+        return len(self._heap)
+
+    def enqueue(self, text, lang, priority=PRIORITY_NORMAL):
+        """Queue a line for playback and return a future that resolves when it is done.
+
+        When the queue is full the least urgent, newest line is dropped to make
+        room; if nothing queued is less urgent than the new line, it is the one
+        dropped and None is returned.
+        """
+        if len(self._heap) >= self.max_depth:
+            worst = max(self._heap)
+            if worst[0] <= priority:
+                return None
+            self._heap.remove(worst)
+            heapq.heapify(self._heap)
+            self._drop(worst[2])
+
+        loop = asyncio.get_running_loop()
+        line = _Line(asyncio.create_task(self._synthesize(text, lang)), loop.create_future())
+        heapq.heappush(self._heap, (priority, next(self._sequence), line))
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+        return line.played
+
+    def clear(self):
+        """Drop every line that has not started playing yet."""
+        while self._heap:
+            self._drop(heapq.heappop(self._heap)[2])
+
+    @staticmethod
+    def _drop(line):
+        line.audio.cancel()
+        if not line.played.done():
+            line.played.set_result(False)
+
+    async def _run(self):
+        while self._heap:
+            _, _, line = heapq.heappop(self._heap)
+            played = False
+            try:
+                audio = await line.audio
+                played = await self._play(audio, line.queued)
+            except Exception as e:
+                print(f"Error generating or playing speech: {e}")
+            finally:
+                if not line.played.done():
+                    line.played.set_result(played)
+
+    async def _play(self, audio, queued):
+        voice_client = self.voice_client
+        if not voice_client or not voice_client.is_connected():
+            return False
+
+        loop = asyncio.get_running_loop()
+        finished = asyncio.Event()
+
+        def after(error):
+            # Runs on the voice player thread
+            if error:
+                print(f"Playback error: {error}")
+            loop.call_soon_threadsafe(finished.set)
+
+        voice_client.play(self._make_source(audio), after=after)
+        speech_start.observe(time.perf_counter() - queued)
+        await finished.wait()
+        return True
+
+
+class SpeechQueues:
+    """Registry of per-guild speech queues."""
+
+    def __init__(self, synthesize, make_source, max_depth=16):
+        self._synthesize = synthesize
+        self._make_source = make_source
+        self.max_depth = max_depth
+        self._queues = {}
+
+    def for_voice_client(self, voice_client):
+        queue = self._queues.get(voice_client.guild.id)
+        if queue is None:
+            queue = SpeechQueue(voice_client, self._synthesize, self._make_source, self.max_depth)
+            self._queues[voice_client.guild.id] = queue
+        queue.voice_client = voice_client  # Reconnects hand us a new client object
+        return queue
+
+    def discard(self, guild_id):
+        queue = self._queues.pop(guild_id, None)
+        if queue:
+            queue.clear()
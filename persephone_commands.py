@@ -1,12 +1,15 @@
 import os
-import json
+import asyncio
 import random
 import discord
 from discord.ext import commands
-from difflib import get_close_matches
 from datetime import datetime
-
-JANUS_ACTIVE = False
+import persephone_index
+import persephone_data
+import persephone_state
+import persephone_topology
+import persephone_embeds
+import janus_metrics
 
 # IDs for DM control and crew-facing terminal
 ROOT_COMMAND_CHANNEL_ID = 1350826672504700938# replace with your #root-command channel ID
@@ -14,45 +17,84 @@ CREW_TERMINAL_CHANNEL_ID = 1350922295782281297# IDs for DM control and crew-faci
 
 # --- File and Directory Setup ---
 base_dir = os.path.dirname(os.path.abspath(__file__))
-zone_state_path = os.path.join(base_dir, "zone_state.json")
-maintenance_log_path = os.path.join(base_dir, "maintenance_log.json")
+zone_state_path = os.path.join(base_dir, "zone_state.json")  # Starting zone states for a guild's first session
+maintenance_log_path = os.path.join(base_dir, "maintenance_log.json")  # Starting maintenance history, likewise
+guild_data_dir = os.path.join(base_dir, "guild_data")
 directives_path = os.path.join(base_dir, "erebus_directives.json")
-with open(directives_path, "r", encoding="utf-8") as f:
-    erebus_directives = json.load(f)
-
-
-try:
-    with open(maintenance_log_path, "r") as f:
-        maintenance_log = json.load(f).get("log", [])
-except FileNotFoundError:
-    maintenance_log = []
-try:
-    with open(maintenance_log_path, "r") as f:
-        maintenance_log = json.load(f).get("log", [])
-except FileNotFoundError:
-    maintenance_log = []
-
-# --- Data Loading ---
-with open(os.path.join(base_dir, "ship_data.json"), "r") as file:
-    ship_profile = json.load(file)
-
-try:
-    with open(zone_state_path, "r") as f:
-        zone_states = json.load(f)
-except FileNotFoundError:
-    zone_states = {}
+ship_data_path = os.path.join(base_dir, "ship_data.json")
+data_snapshot_path = os.path.join(base_dir, "data_snapshot.pickle")  # Compiled ship data, rebuilt when a source changes
 
-# --- Helper Functions ---
-def log_maintenance(action, zone):
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M")
-    maintenance_log.append(f"{timestamp} — {zone}: {action}")
-    with open(maintenance_log_path, "w") as f:
-        json.dump({"log": maintenance_log}, f, indent=4)
+# --- Per-Guild State ---
+# Each guild runs its own ship: zone states, maintenance log and settings live in guild_data/<guild id>/
+MAX_LOADED_GUILDS = 32  # Guilds kept in memory; the least recently used are flushed and dropped
+guild_states = persephone_state.GuildStateEngine(guild_data_dir, zone_state_path, MAX_LOADED_GUILDS,
+                                                 maintenance_log_path)
+
+async def guild_state(ctx):
+    """Load (or fetch from memory) the state for the guild a command came from."""
+    return await guild_states.get(ctx.guild.id if ctx.guild else None)
 
-def save_zone_states():
-    """Save the current zone states to the JSON file."""
-    with open(zone_state_path, "w") as f:
-        json.dump(zone_states, f, indent=4)
+# --- Helper Functions ---
+def log_maintenance(state, action, zone):
+    state.maintenance_log.append(zone, action)
+
+LOG_PAGE_SIZE = 10
+
+def parse_log_query(text):
+    """Split `!log` arguments into (zone text, since timestamp, page).
+
+    Accepts e.g. `medbay`, `since 14:00`, `since 2025-12-14`, `page 2`, in any combination.
+    Raises ValueError for a malformed time or page.
+    """
+    words = text.split()
+    since = None
+    page = 1
+    zone_words = []
+    i = 0
+    while i < len(words):
+        word = words[i].lower()
+        if word in ("page", "since") and i + 1 == len(words):
+            raise ValueError(f"{word} needs a value")
+        if word == "page":
+            page = int(words[i + 1])
+            if page < 1:
+                raise ValueError("page must be positive")
+            i += 2
+        elif word == "since":
+            value = words[i + 1]
+            i += 2
+            # Allow a full "YYYY-MM-DD HH:MM" split across two words
+            if i < len(words) and ":" in words[i] and "-" in value:
+                value = f"{value} {words[i]}"
+                i += 1
+            since = parse_log_time(value)
+        else:
+            zone_words.append(words[i])
+            i += 1
+    return " ".join(zone_words), since, page
+
+def parse_log_time(value):
+    """Turn `14:00`, `2025-12-14` or `2025-12-14 14:00` into a log timestamp."""
+    for fmt in ("%Y-%m-%d %H:%M", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(value, fmt).strftime("%Y-%m-%d %H:%M")
+        except ValueError:
+            pass
+    clock = datetime.strptime(value, "%H:%M")
+    return datetime.now().replace(hour=clock.hour, minute=clock.minute).strftime("%Y-%m-%d %H:%M")
+
+# Callbacks run with the guild id after every zone state change (e.g. to drop cached AI reports)
+zone_state_listeners = []
+
+def save_zone_states(state):
+    """Mark a guild's zone states changed; the write happens shortly after, off the event loop."""
+    state.zone_store.mark_dirty()
+    for listener in zone_state_listeners:
+        listener(state.guild_id)
+
+async def flush_state():
+    """Write any pending state changes to disk immediately."""
+    await guild_states.flush_all()
 
 # Zone name resolution system
 zone_aliases = {
@@ -83,24 +125,127 @@ zone_aliases = {
     "vents": "Maintenance Access & System Shafts"
 }
 
-ZONE_CONNECTIONS = {
-    "Command Bridge": ["Crew Quarters & Cryostasis Wing"],
-    "Crew Quarters & Cryostasis Wing": ["Command Bridge", "Medical Bay", "Maintenance Access & System Shafts"],
-    "Medical Bay": ["Crew Quarters & Cryostasis Wing"],
-    "Maintenance Access & System Shafts": ["Crew Quarters & Cryostasis Wing", "Reactor Room"],
-    "Reactor Room": ["Maintenance Access & System Shafts", "Extractor Control Station", "Cargo Hold"],
-    "Extractor Control Station": ["Reactor Room"],
-    "Cargo Hold": ["Reactor Room"]
-} 
+
+def known_zone_names(profile):
+    """Every zone name the ship data mentions, in profile order."""
+    names = [zone["zone_name"] for zone in profile["ship_zones"]]
+    for deck_zones in profile.get("deckplan", {}).values():
+        names.extend(deck_zones)
+    names.extend(profile.get("schematic", {}).get("zones", {}))
+    return list(dict.fromkeys(names))
+
 def resolve_zone(name):
     """Resolve zone name from input to full zone name."""
-    lowered = name.lower().strip()
-    if lowered in zone_aliases:
-        return zone_aliases[lowered]
-    match = get_close_matches(lowered, [z.lower() for z in zone_states], n=1, cutoff=0.4)
-    if match:
-        return next(z for z in zone_states if z.lower() == match[0])
-    return None
+    return zone_index.resolve(name)
+
+# Zones in these states cannot be passed through
+BLOCKING_STATES = {"Lockdown", "Damaged"}
+
+def route_table(state):
+    """Shortest routes around the guild's locked-down and damaged zones."""
+    blocked = [zone for zone, status in state.zone_states.items() if status in BLOCKING_STATES]
+    table = topology.table(blocked, state.derived.get("routes"))
+    state.derived["routes"] = table
+    return table
+
+def split_zone_pair(text):
+    """Split `!route` arguments into two zone names, e.g. `medbay cargo` or `medbay to cargo hold`."""
+    # Pad so a leading or trailing "to" still splits into two (empty) halves
+    parts = f" {text.lower()} ".split(" to ", 1)
+    if len(parts) == 2 and all(part.strip() for part in parts):
+        return resolve_zone(parts[0].strip()), resolve_zone(parts[1].strip())
+    words = text.split()
+    splits = [(" ".join(words[:i]), " ".join(words[i:])) for i in range(1, len(words))]
+    # Prefer a split where both halves are known names or aliases, then fall back to fuzzy matching
+    for left, right in splits:
+        if left in zone_index and right in zone_index:
+            return resolve_zone(left), resolve_zone(right)
+    for left, right in splits:
+        if resolve_zone(left) and resolve_zone(right):
+            return resolve_zone(left), resolve_zone(right)
+    return None, None
+
+# --- Data Snapshot & Hot Reload ---
+DATA_WATCH_INTERVAL = 2.0  # Seconds between checks of ship_data.json / erebus_directives.json
+
+# Callbacks run after a new data snapshot is swapped in (e.g. to rebuild cached embeds)
+data_reload_listeners = []
+
+# Anything that shapes the snapshot: the data files, the code that builds it and the discord.Embed class
+DATA_SNAPSHOT_SOURCES = [ship_data_path, directives_path, __file__, persephone_data.__file__,
+                         persephone_index.__file__, persephone_embeds.__file__, persephone_topology.__file__,
+                         discord.__file__]
+
+def load_data_snapshot():
+    """Load the compiled snapshot, rebuilding it if any source changed. Safe to run in a worker thread."""
+    return persephone_data.load_compiled(data_snapshot_path, DATA_SNAPSHOT_SOURCES, build_data_snapshot)
+
+def build_data_snapshot():
+    """Parse, validate and index the ship data and directives."""
+    profile = persephone_data.load_ship_profile(ship_data_path)
+    directives = persephone_data.load_directives(directives_path)
+    return {
+        "ship_profile": profile,
+        "erebus_directives": directives,
+        "zone_index": persephone_index.ZoneIndex(known_zone_names(profile), zone_aliases),
+        "directive_index": persephone_index.DirectiveIndex(directives),
+        "embeds": persephone_embeds.build_embeds(profile),
+        "topology": persephone_topology.TopologyEngine(
+            persephone_topology.ShipGraph(profile.get("schematic", {}).get("zones", {}))),
+    }
+
+# Help pages don't depend on the ship data; their JANUS section follows the intent table
+help_embeds = persephone_embeds.build_help_embeds([])
+
+def set_janus_queries(queries):
+    """Rebuild the help pages with these `!janus` report keywords, e.g. after the intents reload."""
+    global help_embeds
+    help_embeds = persephone_embeds.build_help_embeds(queries)
+    embeds.update(help_embeds)
+
+def apply_data_snapshot(snapshot):
+    """Swap in a loaded snapshot in one step, then notify listeners."""
+    global ship_profile, erebus_directives, zone_index, directive_index, topology, embeds
+    ship_profile = snapshot["ship_profile"]
+    erebus_directives = snapshot["erebus_directives"]
+    zone_index = snapshot["zone_index"]
+    directive_index = snapshot["directive_index"]
+    topology = snapshot["topology"]
+    embeds = {**snapshot["embeds"], **help_embeds}
+    for listener in data_reload_listeners:
+        listener()
+
+async def watch_data_files():
+    """Reload ship data and directives whenever their files change on disk."""
+    watcher = persephone_data.FileWatcher([ship_data_path, directives_path], DATA_WATCH_INTERVAL)
+    async for changed in watcher.changes():
+        names = ", ".join(os.path.basename(path) for path in changed)
+        try:
+            snapshot = await asyncio.to_thread(load_data_snapshot)
+        except Exception as e:
+            print(f"Data reload rejected ({names}): {e}")
+            continue
+        apply_data_snapshot(snapshot)
+        print(f"Data reloaded: {names}")
+
+_data_watch_task = None
+
+def start_data_watcher():
+    """Start the background file watcher once; safe to call on every on_ready."""
+    global _data_watch_task
+    if _data_watch_task is None or _data_watch_task.done():
+        _data_watch_task = asyncio.create_task(watch_data_files())
+
+with janus_metrics.startup.phase("ship data"):
+    apply_data_snapshot(load_data_snapshot())
+
+ALERT_LINES = [
+    "Red Alert. Ship systems compromised.",
+    "Security advisory: containment breach possible.",
+    "Environmental hazard detected. Evacuate affected zones.",
+    "Warning. Subsystems unstable. Proceed with caution.",
+    "Attention. Catastrophic failure in progress."
+]
 
 def format_directive(directive):
     """Format an Erebus Directive into a full corporate JANUS message."""
@@ -120,116 +265,76 @@ def format_directive(directive):
         f"Compliance Note: {directive['compliance']}"
     )
 
+def cached_embed_command(name):
+    """Command callback that sends the prebuilt embed for name."""
+    async def send_cached_embed(ctx):
+        embed = embeds.get(name)
+        if embed is None:
+            await ctx.send(f"JANUS: {name.title()} data not available in ship registry.")
+            return
+        await ctx.send(embed=embed)
+    return send_cached_embed
+
 # --- Main Bot Setup ---
 # This function needs to be called directly for the commands to register properly
 def setup(bot):
     # --- Ship Information Commands ---
     @bot.command(name="janus_on")
     async def janus_on(ctx):
-        global JANUS_ACTIVE
-        JANUS_ACTIVE = True
+        state = await guild_state(ctx)
+        state.settings["janus_active"] = True
+        state.settings_store.mark_dirty()
         await ctx.send("JANUS: Systems online. Operational control resumed.")
 
     @bot.command(name="janus_off")
     async def janus_off(ctx):
-        global JANUS_ACTIVE
-        JANUS_ACTIVE = False
+        state = await guild_state(ctx)
+        state.settings["janus_active"] = False
+        state.settings_store.mark_dirty()
         await ctx.send("JANUS: Systems entering standby mode.")
     
     @bot.command(name="ship")
     async def ship_command(ctx, *, topic=None):
         if topic is None:
-            name = ship_profile["ship_name"]
-            owner = ship_profile["owner"]
-            crew_max = ship_profile["crew"]["maximum_complement"]
-            extractors = ship_profile["extraction_systems"]["extractor_units"]
-            ai_name = ship_profile["ai_name"]
-            commissioned = ship_profile["commissioned_year"]
-
-            embed = discord.Embed(
-                title=f"Vessel Overview — {name}",
-                description=f"{name} is an {ship_profile['class']}, commissioned in {commissioned} at the {ship_profile['manufactured_at']}.",
-                color=discord.Color.dark_blue()
-            )
-            embed.add_field(name="Owner", value=owner, inline=True)
-            embed.add_field(name="AI System", value=ai_name, inline=True)
-            embed.add_field(name="Crew Capacity", value=f"{crew_max} personnel", inline=True)
-            embed.add_field(name="Extractor Units", value=f"{extractors}", inline=True)
-            embed.set_footer(text=f"{name} — Erebus Corp Resource Harvester")
-            await ctx.send(embed=embed)
+            await ctx.send(embed=embeds["ship"])
             return
 
         # Display information about a specific room/zone (exact match)
-        topic = topic.lower().strip()
-
-        for zone in ship_profile["ship_zones"]:
-            if topic == zone["zone_name"].lower():
-                embed = discord.Embed(
-                    title=zone["zone_name"],
-                    description=zone["description"],
-                    color=discord.Color.orange()
-                )
-                embed.set_footer(text=f"{ship_profile['ship_name']} — Erebus Corp Resource Harvester")
-                await ctx.send(embed=embed)
-                return
+        embed = embeds["zones"].get(topic.lower().strip())
+        if embed:
+            await ctx.send(embed=embed)
+            return
 
         await ctx.send("No match found. Try `!ship reactor room`, `!ship medical bay`, or `!help_ship`.")
 
-    @bot.command(name="deckplan")
-    async def deckplan_command(ctx):
-        deckplan_data = ship_profile.get("deckplan", {})
-        if not deckplan_data:
-            await ctx.send("JANUS: Deckplan data not available in ship registry.")
-            return
-            
-        embed = discord.Embed(
-            title="Persephone Deckplan",
-            description="Internal structure by deck — Erebus Corp proprietary configuration.",
-            color=discord.Color.dark_blue()
-        )
-        
-        for deck, zones in deckplan_data.items():
-            embed.add_field(name=deck, value="\n".join(zones), inline=False)
-            
-        embed.set_footer(text="JANUS Deckplan Interface — Erebus Systems Division")
-        await ctx.send(embed=embed)
-    
-    @bot.command(name="rooms")
-    async def rooms_command(ctx):
-        zone_names = [zone["zone_name"] for zone in ship_profile["ship_zones"]]
-        embed = discord.Embed(
-            title="Persephone Zone Directory",
-            description="All operational ship zones currently mapped.",
-            color=discord.Color.dark_blue()
-        )
-        
-        for zone in zone_names:
-            embed.add_field(name="•", value=zone, inline=False)
-            
-        embed.set_footer(text="Mapping retrieved from Janus Core — Erebus Corp Property")
-        await ctx.send(embed=embed)
+    # Static informational embeds, prebuilt from the ship profile (see persephone_embeds)
+    static_embed_commands = ["deckplan", "rooms", "crew", "extractors", *persephone_embeds.HELP_PAGES]
+    for name in static_embed_commands:
+        bot.command(name=name)(cached_embed_command(name))
 
     # --- Zone Status Commands ---
     @bot.command(name="status")
     async def status_command(ctx):
+        state = await guild_state(ctx)
         embed = discord.Embed(
             title="Ship Systems Status Report",
             description="Current operational state of all monitored ship zones.",
             color=discord.Color.red()
         )
         
-        for zone, state in zone_states.items():
-            emoji = "✅" if state == "Online" else ("⛔" if state == "Lockdown" else "⚠️")
-            embed.add_field(name=zone, value=f"{emoji} {state}", inline=False)
+        for zone, status in state.zone_states.items():
+            emoji = "✅" if status == "Online" else ("⛔" if status == "Lockdown" else "⚠️")
+            embed.add_field(name=zone, value=f"{emoji} {status}", inline=False)
             
         embed.set_footer(text="Erebus Corp — Maintenance Log Certified")
         await ctx.send(embed=embed)
 
     @bot.command(name="report")
     async def report_command(ctx):
-        damaged = [z for z, state in zone_states.items() if state == "Damaged"]
-        locked = [z for z, state in zone_states.items() if state == "Lockdown"]
-        total_zones = len(zone_states)
+        state = await guild_state(ctx)
+        damaged = [z for z, status in state.zone_states.items() if status == "Damaged"]
+        locked = [z for z, status in state.zone_states.items() if status == "Lockdown"]
+        total_zones = len(state.zone_states)
         
         embed = discord.Embed(
             title="JANUS — Mission Readiness Report",
@@ -250,13 +355,31 @@ def setup(bot):
         embed.set_footer(text="Report generated by JANUS | Erebus Corp Oversight Module")
         await ctx.send(embed=embed)
     @bot.command(name="log")
-    async def log_command(ctx):
-        if not maintenance_log:
+    async def log_command(ctx, *, query=""):
+        try:
+            zone_text, since, page = parse_log_query(query)
+        except ValueError:
+            await ctx.send("JANUS: Query not recognized. Example: `!log medbay since 14:00 page 2`")
+            return
+
+        zone = None
+        if zone_text:
+            zone = resolve_zone(zone_text)
+            if not zone:
+                await ctx.send("JANUS: Zone not recognized. Try `!status`, `!ship`, or `!help_ship`.")
+                return
+
+        state = await guild_state(ctx)
+        entries, has_more = await state.maintenance_log.query(zone, since, page, LOG_PAGE_SIZE)
+        if not entries:
             await ctx.send("JANUS: No maintenance activity recorded.")
             return
 
-        recent = maintenance_log[-3:]
-        message = "JANUS: Recent maintenance activity:\n" + "\n".join(recent)
+        scope = ", ".join(filter(None, [zone, f"since {since}" if since else None, f"page {page}"]))
+        lines = [f"{e['ts']} — {e['zone']}: {e['action']}" for e in entries]
+        message = f"JANUS: Maintenance activity ({scope}):\n" + "\n".join(lines)
+        if has_more:
+            message += f"\nOlder entries available. Use `page {page + 1}`."
         await ctx.send(message)
 
     # --- Zone Control Commands ---
@@ -267,9 +390,10 @@ def setup(bot):
             return
         real_zone = resolve_zone(zone)
         if real_zone:
-            zone_states[real_zone] = "Damaged"
-            save_zone_states()
-            log_maintenance("Damaged", real_zone)
+            state = await guild_state(ctx)
+            state.zone_states[real_zone] = "Damaged"
+            save_zone_states(state)
+            log_maintenance(state, "Damaged", real_zone)
             await ctx.send(f"JANUS: {real_zone} reports damage to primary systems. Maintenance team required.")
         else:
             await ctx.send("JANUS: Zone not recognized. Try `!status`, `!ship`, or `!help_ship`.")
@@ -280,11 +404,13 @@ def setup(bot):
         if not zone:
             await ctx.send("Specify a zone to repair. Example: `!repair medbay`")
             return
+
+        real_zone = resolve_zone(zone)
         if real_zone:
-            zone_states[real_zone] = "Online"
-            save_zone_states()
-            log_maintenance("repaired", real_zone)
-            real_zone = resolve_zone(zone)
+            state = await guild_state(ctx)
+            state.zone_states[real_zone] = "Online"
+            save_zone_states(state)
+            log_maintenance(state, "repaired", real_zone)
             await ctx.send(f"JANUS: {real_zone} restored to operational status.")
         else:
             await ctx.send("JANUS: Zone not recognized. Try `!status`, `!ship`, or `!help_ship`.")
@@ -298,9 +424,10 @@ def setup(bot):
             
         real_zone = resolve_zone(zone)
         if real_zone:
-            zone_states[real_zone] = "Lockdown"
-            save_zone_states()
-            log_maintenance("lockdown", real_zone)
+            state = await guild_state(ctx)
+            state.zone_states[real_zone] = "Lockdown"
+            save_zone_states(state)
+            log_maintenance(state, "lockdown", real_zone)
             await ctx.send(f"JANUS: {real_zone} placed under isolation protocol. Crew access restricted.")
         else:
             await ctx.send("JANUS: Zone not recognized. Try `!status`, `!ship`, or `!help_ship`.")
@@ -314,24 +441,27 @@ def setup(bot):
             
         real_zone = resolve_zone(zone)
         if real_zone:
-            zone_states[real_zone] = "Online"
-            save_zone_states()
-            log_maintenance("unlocked", real_zone)
+            state = await guild_state(ctx)
+            state.zone_states[real_zone] = "Online"
+            save_zone_states(state)
+            log_maintenance(state, "unlocked", real_zone)
             await ctx.send(f"JANUS: Lockdown lifted for {real_zone}. Zone access restored.")
         else:
             await ctx.send("JANUS: Zone not recognized. Try `!status`, `!ship`, or `!help_ship`.")
 
     @bot.command(name="reset_all")
     async def reset_all_command(ctx):
-        for zone in zone_states:
-            zone_states[zone] = "Online"
-            save_zone_states()
-            log_maintenance("reset_all", zone)
+        state = await guild_state(ctx)
+        for zone in state.zone_states:
+            state.zone_states[zone] = "Online"
+            log_maintenance(state, "reset_all", zone)
+        save_zone_states(state)
         await ctx.send("JANUS: All ship zones restored to nominal status. Maintenance backlog cleared.")
 
     @bot.command(name="impact")
     async def impact_command(ctx, *, cause="UNKNOWN"):
-        available = list(zone_states.keys())
+        state = await guild_state(ctx)
+        available = list(state.zone_states.keys())
         
         if not available:
             await ctx.send(
@@ -343,57 +473,19 @@ def setup(bot):
         impacted = random.sample(available, k)
                 
         for zone in impacted:
-            zone_states[zone] = "Damaged"
-        save_zone_states()
+            state.zone_states[zone] = "Damaged"
+        save_zone_states(state)
         report = "\n".join([f"⚠️ {z} — Damaged" for z in impacted])
-        await ctx.send(f"JANUS: External collision registered. Impact cause: {cause.title()}.\n"
-                    f"JANUS: Systems destabilized. Damage assessment complete.\n\n{report}")
+        await ctx.bot.speak_alert(ctx, f"JANUS: External collision registered. Impact cause: {cause.title()}.\n"
+                                       f"JANUS: Systems destabilized. Damage assessment complete.\n\n{report}")
 
     # --- Crew & Ship Systems Commands ---
-    @bot.command(name="crew")
-    async def crew_command(ctx):
-        crew_info = ship_profile["crew"]
-        shifts = crew_info["rotation_protocol"]["shift_structure"]
-        
-        embed = discord.Embed(
-            title="Crew Operations — Shift & Rotation Protocol",
-            description=(
-                f"Max crew: **{crew_info['maximum_complement']}**\n"
-                f"Min operational: **{crew_info['minimum_operational_crew']}**\n\n"
-                f"Teams: **{', '.join(crew_info['rotation_protocol']['crews'])}**\n"
-                f"Shifts: **{shifts['active_hours']}h on / {shifts['rest_hours']}h off**\n"
-                f"Extended break: **{shifts['monthly_extended_rest']}**\n"
-                f"Off-duty procedure: {crew_info['rotation_protocol']['off_duty_procedure']}"
-            ), 
-            color=discord.Color.teal()
-        )
-        
-        embed.set_footer(text="Erebus Corporation – Personnel Compliance Required")
-        await ctx.send(embed=embed)
     @bot.command(name="ai")
     async def ai_command(ctx):
         await ctx.send(
         "JANUS: AI core online. Oversight active. Autonomy restricted per Erebus Corporation policy."
     )
-    @bot.command(name="extractors")
-    async def extractors_command(ctx):
-        xsys = ship_profile["extraction_systems"]
-        
-        embed = discord.Embed(
-            title="Extractor Unit Overview",
-            description=(
-                f"{ship_profile['ship_name']} is equipped with **{xsys['extractor_units']} Extractor Units**.\n\n"
-                f"Technology: **{xsys['technology']}**\n\n"
-                f"{xsys['description']}\n\n"
-                f"Resource Targets: {', '.join(xsys['resource_targets'])}"
-            ), 
-            color=discord.Color.dark_gold()
-        )
-        
-        embed.set_footer(text="Ore Recovery Certified — Erebus Industrial Mining Division")
-        await ctx.send(embed=embed)
 
-def setup(bot):
     @bot.command(name="event")
     async def event_command(ctx, *, description: str = "random"):
             # Only allow this from the root command channel
@@ -414,21 +506,15 @@ def setup(bot):
             priority = "low"
             requested_title = None
 
-        known_priorities = {str(d.get("priority", "")).strip().lower() for d in erebus_directives}
-
-        if priority in known_priorities:
-            pool = [d for d in erebus_directives if str(d.get("priority", "")).strip().lower() == priority]
-
-            if not pool:
-                message = "JANUS: No directives available at requested priority level."
-            elif requested_title:
-                matches = [d for d in pool if str(d.get("title", "")).strip().lower() == requested_title.lower()]
-                if not matches:
+        if directive_index.has_priority(priority):
+            if requested_title:
+                directive = directive_index.find(priority, requested_title)
+                if directive is None:
                     message = "JANUS: Requested directive not found at specified priority level."
                 else:
-                    message = format_directive(matches[0])
+                    message = format_directive(directive)
             else:
-                directive = random.choice(pool)
+                directive = directive_index.draw(priority, ctx.guild.id if ctx.guild else None)
                 message = format_directive(directive)
         else:
             message = f"JANUS: {description}"
@@ -439,164 +525,8 @@ def setup(bot):
     # --- Alert System Command ---
     @bot.command(name="alert")
     async def alert_command(ctx):
-        alert_lines = [
-            "Red Alert. Ship systems compromised.",
-            "Security advisory: containment breach possible.",
-            "Environmental hazard detected. Evacuate affected zones.",
-            "Warning. Subsystems unstable. Proceed with caution.",
-            "Attention. Catastrophic failure in progress."
-        ]
-        line = random.choice(alert_lines)
-        await ctx.send(f"JANUS: {line}")
-
-    # --- Help Commands ---
-    @bot.command(name="help_commands")
-    async def help_commands_command(ctx):
-        embed = discord.Embed(
-            title="Command Reference",
-            description="Available commands for the Persephone bot.",
-            color=discord.Color.blue()
-        )
-        
-        embed.add_field(name="Crew Commands", value=(
-            "`!ship`\n"
-            "`!ship [room]`\n"
-            "`!crew`\n"
-            "`!ai`\n"
-            "`!extractors`\n"
-            "`!status`\n"
-            "`!report`\n"
-            "`!rooms`\n"
-            "`!deckplan`\n"
-            "`!whereis [zone]`\n"
-        ), inline=False)
-
-        embed.add_field(name="JANUS AI Queries", value=(
-            "`!janus diagnostics`\n"
-            "`!janus ore status`\n"
-            "`!janus life support`\n"
-            "`!janus power status`\n"
-            "`!janus mission status`\n"
-            "`!janus maintenance log`\n"
-            "`!janus corporate message`\n"
-            "`!janus crew status`\n"
-            "`!janus survey`\n"
-            "`!janus analyze artifact`"
-        ), inline=False)
-
-        embed.add_field(name="System Control (DM Access)", value=(
-            "`!damage <zone>`\n"
-            "`!repair <zone>`\n"
-            "`!lockdown <zone>`\n"
-            "`!unlock <zone>`\n"
-            "`!reset_all`\n"
-            "`!impact [cause]`\n"
-            "`!alert`"
-        ), inline=False)
-
-        embed.add_field(name="Voice System", value=(
-            "`!join`\n"
-            "`!leave`\n"
-            "`!voice [code]`\n"
-            "`!test [msg]`"
-        ), inline=False)
-
-        embed.set_footer(text="For internal use only — Erebus Corporation Property")
-        await ctx.send(embed=embed)
-
-    @bot.command(name="help_crew")
-    async def help_crew_command(ctx):
-        embed = discord.Embed(
-            title="Crew Command Reference",
-            description="JANUS access interface — Authorized personnel only",
-            color=discord.Color.green()
-        )
-        
-        embed.add_field(name="Ship & Crew Systems", value=(
-            "`!ship`\n"
-            "`!ship [room]`\n"
-            "`!crew`\n"
-            "`!ai`\n"
-            "`!extractors`\n"
-            "`!status`\n"
-            "`!report`\n"
-            "`!rooms`\n"
-            "`!deckplan`\n"
-            "`!whereis [zone]`\n"
-            
-        ), inline=False)
-
-        embed.add_field(name="JANUS AI Queries", value=(
-            "`!janus diagnostics`\n"
-            "`!janus ore status`\n"
-            "`!janus life support`\n"
-            "`!janus power status`\n"
-            "`!janus mission status`\n"
-            "`!janus maintenance log`\n"
-            "`!janus corporate message`\n"
-            "`!janus crew status`\n"
-            "`!janus survey`\n"
-            "`!janus analyze artifact`"
-        ), inline=False)
-
-        embed.set_footer(text="Erebus Corporation – Crew Access Tier 3")
-        await ctx.send(embed=embed)
-
-    @bot.command(name="help_ship")
-    async def help_ship_command(ctx):
-        # Now we create our own function to avoid calling another command function
-        embed = discord.Embed(
-            title="Persephone Systems Interface",
-            description="Command Directory — Erebus Corporation Access Tier C",
-            color=discord.Color.blue()
-        )
-        
-        embed.add_field(name="Crew Commands", value=(
-            "`!ship`\n"
-            "`!ship [room]`\n"
-            "`!crew`\n"
-            "`!ai`\n"
-            "`!extractors`\n"
-            "`!status`\n"
-            "`!report`\n"
-            "`!rooms`\n"
-            "`!deckplan`\n"
-            "`!whereis [zone]`\n"
-            
-        ), inline=False)
-
-        embed.add_field(name="JANUS AI Queries", value=(
-            "`!janus diagnostics`\n"
-            "`!janus ore status`\n"
-            "`!janus life support`\n"
-            "`!janus power status`\n"
-            "`!janus mission status`\n"
-            "`!janus maintenance log`\n"
-            "`!janus corporate message`\n"
-            "`!janus crew status`\n"
-            "`!janus survey`\n"
-            "`!janus analyze artifact`"
-        ), inline=False)
-
-        embed.add_field(name="System Control (DM Access)", value=(
-            "`!damage <zone>`\n"
-            "`!repair <zone>`\n"
-            "`!lockdown <zone>`\n"
-            "`!unlock <zone>`\n"
-            "`!reset_all`\n"
-            "`!impact [cause]`\n"
-            "`!alert`"
-        ), inline=False)
-
-        embed.add_field(name="Voice System", value=(
-            "`!join`\n"
-            "`!leave`\n"
-            "`!voice [code]`\n"
-            "`!test [msg]`"
-        ), inline=False)
-
-        embed.set_footer(text="For internal use only — Erebus Corporation Property")
-        await ctx.send(embed=embed)
+        line = random.choice(ALERT_LINES)
+        await ctx.bot.speak_alert(ctx, f"JANUS: {line}")
 
     # Don't forget to implement whereis command which is mentioned in help but not defined
     @bot.command(name="whereis")
@@ -608,8 +538,50 @@ def setup(bot):
         real_zone = resolve_zone(zone)
         if real_zone:
             deck = next((z.get("deck") for z in ship_profile["ship_zones"] if z["zone_name"] == real_zone), "Unknown")
-            links = ZONE_CONNECTIONS.get(real_zone, [])
+            links = topology.graph.neighbours.get(real_zone, [])
             links_text = ", ".join(links) if links else "No connection data."
             await ctx.send(
                 f"JANUS: {real_zone}. Deck: {deck}. Access: {links_text}."
-)
+            )
+        else:
+            await ctx.send("JANUS: Zone not recognized. Try `!status`, `!ship`, or `!help_ship`.")
+
+    @bot.command(name="route")
+    async def route_command(ctx, *, zones=None):
+        if not zones:
+            await ctx.send("Specify two zones. Example: `!route medbay to cargo`")
+            return
+
+        start, end = split_zone_pair(zones)
+        if not start or not end:
+            await ctx.send("JANUS: Zones not recognized. Example: `!route medbay to cargo`")
+            return
+        missing = [z for z in (start, end) if z not in topology.graph]
+        if missing:
+            await ctx.send(f"JANUS: No schematic data for {', '.join(missing)}.")
+            return
+
+        state = await guild_state(ctx)
+        table = route_table(state)
+        path = table.route(start, end)
+        if path is None:
+            await ctx.send(f"JANUS: No accessible route from {start} to {end}. Obstructed zones: "
+                           f"{', '.join(sorted(table.blocked)) or 'none'}.")
+            return
+        await ctx.send(f"JANUS: Route {start} → {end}: {' → '.join(path)}. Transit zones: {len(path) - 1}.")
+
+    @bot.command(name="isolated")
+    async def isolated_command(ctx):
+        state = await guild_state(ctx)
+        table = route_table(state)
+        origin = ship_profile.get("schematic", {}).get("orientation", {}).get("fore", "Command Bridge")
+        reachable = table.reachable(origin)
+        sealed = sorted(table.blocked)
+        cut_off = sorted(z for z in topology.graph.neighbours if z not in reachable and z not in table.blocked)
+
+        if not sealed and not cut_off:
+            await ctx.send(f"JANUS: All mapped zones accessible from {origin}.")
+            return
+        lines = [f"⛔ {z} — {state.zone_states.get(z)}" for z in sealed]
+        lines += [f"⚠️ {z} — No access from {origin}" for z in cut_off]
+        await ctx.send("JANUS: Zone isolation report.\n" + "\n".join(lines))
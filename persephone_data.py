@@ -0,0 +1,121 @@
+import asyncio
+import json
+import os
+import pickle
+
+
+def load_json(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_ship_profile(path):
+    """Load ship_data.json, raising ValueError if it is missing fields the commands rely on."""
+    profile = load_json(path)
+    if not isinstance(profile, dict):
+        raise ValueError("ship profile must be a JSON object")
+    for key in ("ship_name", "owner", "class", "manufactured_at", "commissioned_year", "ai_name",
+                "crew", "extraction_systems", "ship_zones"):
+        if key not in profile:
+            raise ValueError(f"ship profile is missing '{key}'")
+    for zone in profile["ship_zones"]:
+        if "zone_name" not in zone or "description" not in zone:
+            raise ValueError("every ship zone needs a zone_name and description")
+    return profile
+
+
+def load_directives(path):
+    """Load erebus_directives.json, raising ValueError on malformed entries."""
+    directives = load_json(path)
+    if not isinstance(directives, list):
+        raise ValueError("directives must be a JSON list")
+    for directive in directives:
+        missing = {"title", "location", "summary", "priority", "compliance"} - set(directive)
+        if missing:
+            raise ValueError(f"directive '{directive.get('title', '?')}' is missing {', '.join(sorted(missing))}")
+    return directives
+
+
+def file_signature(paths):
+    """(path, mtime, size) for each file; changes whenever any of them is edited, replaced or removed."""
+    signature = []
+    for path in paths:
+        try:
+            info = os.stat(path)
+        except FileNotFoundError:
+            signature.append((path, None, None))
+            continue
+        signature.append((path, info.st_mtime_ns, info.st_size))
+    return signature
+
+
+def load_compiled(cache_path, sources, build):
+    """Return build(), reusing the pickle at cache_path while none of the source files has changed.
+
+    The pickle holds the sources' signature followed by the built value, so a
+    stale snapshot is detected without unpickling the value. List the modules
+    that build the value among the sources as well as the data files, so a
+    code change also forces a rebuild. The snapshot is written by this bot
+    next to its own code and is trusted the same way.
+    """
+    signature = file_signature(sources)
+    try:
+        with open(cache_path, "rb") as f:
+            if pickle.load(f) == signature:
+                return pickle.load(f)
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"Rebuilding data snapshot, {os.path.basename(cache_path)} is unreadable: {e}")
+    value = build()
+    temp_path = f"{cache_path}.tmp"
+    try:
+        with open(temp_path, "wb") as f:
+            pickle.dump(signature, f, pickle.HIGHEST_PROTOCOL)
+            pickle.dump(value, f, pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, cache_path)
+    except OSError as e:
+        print(f"Failed to save data snapshot: {e}")
+    return value
+
+
+class FileWatcher:
+    """Detects edits to a set of files by polling their mtime and size.
+
+    Polling keeps this portable (the bot runs on Windows as well as Linux)
+    and costs one stat per file per interval.
+    """
+
+    def __init__(self, paths, interval=2.0, settle=0.5):
+        self.paths = list(paths)
+        self.interval = interval
+        self.settle = settle  # Wait this long after a change so editors finish writing
+        self._seen = {path: self._stat(path) for path in self.paths}
+
+    @staticmethod
+    def _stat(path):
+        try:
+            info = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return info.st_mtime_ns, info.st_size
+
+    def _poll(self):
+        changed = []
+        for path in self.paths:
+            current = self._stat(path)
+            if current != self._seen[path]:
+                self._seen[path] = current
+                changed.append(path)
+        return changed
+
+    async def changes(self):
+        """Yield the list of changed paths each time one or more files change."""
+        while True:
+            await asyncio.sleep(self.interval)
+            changed = await asyncio.to_thread(self._poll)
+            if not changed:
+                continue
+            await asyncio.sleep(self.settle)
+            changed.extend(p for p in await asyncio.to_thread(self._poll) if p not in changed)
+            yield changed
@@ -0,0 +1,176 @@
+import discord
+
+# --- Command Registry ---
+# Usage lines shown in the help embeds, grouped by section. The "janus" section lists the
+# report keywords from the intent table and is passed to build_help_embeds separately.
+COMMAND_SECTIONS = {
+    "crew": [
+        "`!ship`",
+        "`!ship [room]`",
+        "`!crew`",
+        "`!ai`",
+        "`!extractors`",
+        "`!status`",
+        "`!report`",
+        "`!log [zone] [since time] [page n]`",
+        "`!rooms`",
+        "`!deckplan`",
+        "`!whereis [zone]`",
+        "`!route <from> <to>`",
+        "`!isolated`",
+    ],
+    "control": [
+        "`!damage <zone>`",
+        "`!repair <zone>`",
+        "`!lockdown <zone>`",
+        "`!unlock <zone>`",
+        "`!reset_all`",
+        "`!impact [cause]`",
+        "`!alert`",
+    ],
+    "voice": [
+        "`!join`",
+        "`!leave`",
+        "`!voice [code]`",
+        "`!test [msg]`",
+    ],
+}
+
+# Help commands: each lists (section, heading) pairs from COMMAND_SECTIONS
+HELP_PAGES = {
+    "help_commands": {
+        "title": "Command Reference",
+        "description": "Available commands for the Persephone bot.",
+        "color": "blue",
+        "sections": [("crew", "Crew Commands"), ("janus", "JANUS AI Queries"),
+                     ("control", "System Control (DM Access)"), ("voice", "Voice System")],
+        "footer": "For internal use only — Erebus Corporation Property",
+    },
+    "help_crew": {
+        "title": "Crew Command Reference",
+        "description": "JANUS access interface — Authorized personnel only",
+        "color": "green",
+        "sections": [("crew", "Ship & Crew Systems"), ("janus", "JANUS AI Queries")],
+        "footer": "Erebus Corporation – Crew Access Tier 3",
+    },
+    "help_ship": {
+        "title": "Persephone Systems Interface",
+        "description": "Command Directory — Erebus Corporation Access Tier C",
+        "color": "blue",
+        "sections": [("crew", "Crew Commands"), ("janus", "JANUS AI Queries"),
+                     ("control", "System Control (DM Access)"), ("voice", "Voice System")],
+        "footer": "For internal use only — Erebus Corporation Property",
+    },
+}
+
+
+# --- Embed Builders ---
+def help_embed(page, sections=COMMAND_SECTIONS):
+    embed = discord.Embed(
+        title=page["title"],
+        description=page["description"],
+        color=getattr(discord.Color, page["color"])()
+    )
+    for section, heading in page["sections"]:
+        embed.add_field(name=heading, value="\n".join(sections[section]), inline=False)
+    embed.set_footer(text=page["footer"])
+    return embed
+
+def ship_embed(profile):
+    name = profile["ship_name"]
+    embed = discord.Embed(
+        title=f"Vessel Overview — {name}",
+        description=f"{name} is an {profile['class']}, commissioned in {profile['commissioned_year']} at the {profile['manufactured_at']}.",
+        color=discord.Color.dark_blue()
+    )
+    embed.add_field(name="Owner", value=profile["owner"], inline=True)
+    embed.add_field(name="AI System", value=profile["ai_name"], inline=True)
+    embed.add_field(name="Crew Capacity", value=f"{profile['crew']['maximum_complement']} personnel", inline=True)
+    embed.add_field(name="Extractor Units", value=f"{profile['extraction_systems']['extractor_units']}", inline=True)
+    embed.set_footer(text=f"{name} — Erebus Corp Resource Harvester")
+    return embed
+
+def zone_embed(profile, zone):
+    embed = discord.Embed(
+        title=zone["zone_name"],
+        description=zone["description"],
+        color=discord.Color.orange()
+    )
+    embed.set_footer(text=f"{profile['ship_name']} — Erebus Corp Resource Harvester")
+    return embed
+
+def deckplan_embed(profile):
+    embed = discord.Embed(
+        title="Persephone Deckplan",
+        description="Internal structure by deck — Erebus Corp proprietary configuration.",
+        color=discord.Color.dark_blue()
+    )
+    for deck, zones in profile["deckplan"].items():
+        embed.add_field(name=deck, value="\n".join(zones), inline=False)
+    embed.set_footer(text="JANUS Deckplan Interface — Erebus Systems Division")
+    return embed
+
+def rooms_embed(profile):
+    embed = discord.Embed(
+        title="Persephone Zone Directory",
+        description="All operational ship zones currently mapped.",
+        color=discord.Color.dark_blue()
+    )
+    for zone in profile["ship_zones"]:
+        embed.add_field(name="•", value=zone["zone_name"], inline=False)
+    embed.set_footer(text="Mapping retrieved from Janus Core — Erebus Corp Property")
+    return embed
+
+def crew_embed(profile):
+    crew_info = profile["crew"]
+    shifts = crew_info["rotation_protocol"]["shift_structure"]
+    embed = discord.Embed(
+        title="Crew Operations — Shift & Rotation Protocol",
+        description=(
+            f"Max crew: **{crew_info['maximum_complement']}**\n"
+            f"Min operational: **{crew_info['minimum_operational_crew']}**\n\n"
+            f"Teams: **{', '.join(crew_info['rotation_protocol']['crews'])}**\n"
+            f"Shifts: **{shifts['active_hours']}h on / {shifts['rest_hours']}h off**\n"
+            f"Extended break: **{shifts['monthly_extended_rest']}**\n"
+            f"Off-duty procedure: {crew_info['rotation_protocol']['off_duty_procedure']}"
+        ),
+        color=discord.Color.teal()
+    )
+    embed.set_footer(text="Erebus Corporation – Personnel Compliance Required")
+    return embed
+
+def extractors_embed(profile):
+    xsys = profile["extraction_systems"]
+    embed = discord.Embed(
+        title="Extractor Unit Overview",
+        description=(
+            f"{profile['ship_name']} is equipped with **{xsys['extractor_units']} Extractor Units**.\n\n"
+            f"Technology: **{xsys['technology']}**\n\n"
+            f"{xsys['description']}\n\n"
+            f"Resource Targets: {', '.join(xsys['resource_targets'])}"
+        ),
+        color=discord.Color.dark_gold()
+    )
+    embed.set_footer(text="Ore Recovery Certified — Erebus Industrial Mining Division")
+    return embed
+
+def build_help_embeds(janus_queries):
+    """Build the help pages, listing `!janus <query>` for each report keyword in janus_queries."""
+    sections = dict(COMMAND_SECTIONS, janus=[f"`!janus {query}`" for query in janus_queries] or ["`!janus <question>`"])
+    return {name: help_embed(page, sections) for name, page in HELP_PAGES.items()}
+
+def build_embeds(profile):
+    """Build every static embed from the ship profile (the help pages come from build_help_embeds).
+
+    Returns a dict keyed by command name, plus "zones" mapping lowercased
+    zone names to their `!ship <room>` embed. Commands whose data is missing
+    from the profile are left out.
+    """
+    embeds = {"ship": ship_embed(profile)}
+    embeds["zones"] = {zone["zone_name"].lower(): zone_embed(profile, zone) for zone in profile["ship_zones"]}
+    embeds["rooms"] = rooms_embed(profile)
+    embeds["crew"] = crew_embed(profile)
+    embeds["extractors"] = extractors_embed(profile)
+    if profile.get("deckplan"):
+        embeds["deckplan"] = deckplan_embed(profile)
+    return embeds
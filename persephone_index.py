@@ -0,0 +1,111 @@
+import random
+from collections import Counter, OrderedDict, defaultdict
+from difflib import SequenceMatcher
+
+
+def ngrams(text, n=3):
+    padded = f"  {text} "
+    return {padded[i:i + n] for i in range(len(padded) - n + 1)}
+
+
+class ZoneIndex:
+    """Zone name lookup built once from the ship profile and alias table.
+
+    Exact names and aliases resolve through a dict. Anything else is matched
+    fuzzily: a trigram index narrows the field to a few candidates, which are
+    ranked with the same SequenceMatcher ratio difflib uses. Fuzzy results
+    are memoized, so repeated typos cost a dict lookup.
+    """
+
+    def __init__(self, names, aliases, cutoff=0.4, candidates=8, memo_size=1024):
+        self.cutoff = cutoff
+        self.candidates = candidates
+        self.memo_size = memo_size
+        self._exact = {}  # lowercase name or alias -> zone name
+        for name in names:
+            self._exact.setdefault(name.lower(), name)
+        for alias, target in aliases.items():
+            self._exact[alias.lower()] = target
+        self._grams = defaultdict(list)
+        for key in self._exact:
+            for gram in ngrams(key):
+                self._grams[gram].append(key)
+        self._memo = OrderedDict()
+
+    def __contains__(self, name):
+        return name.lower().strip() in self._exact
+
+    def resolve(self, name):
+        """Return the zone name for name, or None if nothing is close enough."""
+        lowered = name.lower().strip()
+        if lowered in self._exact:
+            return self._exact[lowered]
+        if lowered in self._memo:
+            self._memo.move_to_end(lowered)
+            return self._memo[lowered]
+
+        match = self._fuzzy(lowered)
+        self._memo[lowered] = match
+        if len(self._memo) > self.memo_size:
+            self._memo.popitem(last=False)
+        return match
+
+    def _fuzzy(self, lowered):
+        shared = Counter()
+        for gram in ngrams(lowered):
+            shared.update(self._grams.get(gram, ()))
+        best, best_score = None, self.cutoff
+        for key, _ in shared.most_common(self.candidates):
+            score = SequenceMatcher(None, lowered, key).ratio()
+            if score >= best_score and (best is None or score > best_score):
+                best, best_score = key, score
+        return self._exact[best] if best else None
+
+
+def normalize(text):
+    return " ".join(str(text or "").split()).lower()
+
+
+class DirectiveIndex:
+    """Erebus directives grouped by priority, with O(1) title lookup.
+
+    Random picks come from a shuffle bag per (guild, priority): every
+    directive at that priority is issued once before any repeats, and a
+    refilled bag never starts with the directive that was just issued.
+    """
+
+    def __init__(self, directives):
+        self.by_priority = defaultdict(list)
+        self.by_title = {}  # (priority, title) -> directive
+        for directive in directives:
+            priority = normalize(directive.get("priority"))
+            self.by_priority[priority].append(directive)
+            self.by_title.setdefault((priority, normalize(directive.get("title"))), directive)
+        self._bags = {}  # (guild id, priority) -> remaining directive positions
+        self._last = {}  # (guild id, priority) -> position issued last
+
+    def has_priority(self, priority):
+        return normalize(priority) in self.by_priority
+
+    def find(self, priority, title):
+        return self.by_title.get((normalize(priority), normalize(title)))
+
+    def draw(self, priority, guild_id=None):
+        """Pick the next directive at priority for a guild without back-to-back repeats."""
+        priority = normalize(priority)
+        pool = self.by_priority.get(priority)
+        if not pool:
+            return None
+
+        key = (guild_id, priority)
+        bag = self._bags.get(key)
+        if not bag:
+            bag = list(range(len(pool)))
+            random.shuffle(bag)
+            # The bag is drawn from the end; keep the previous pick away from it
+            if len(bag) > 1 and bag[-1] == self._last.get(key):
+                bag[0], bag[-1] = bag[-1], bag[0]
+            self._bags[key] = bag
+        position = bag.pop()
+        self._last[key] = position
+        return pool[position]
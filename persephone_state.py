@@ -0,0 +1,111 @@
+import asyncio
+import json
+import os
+from collections import OrderedDict
+import persephone_store
+
+
+class GuildState:
+    """One guild's ship: zone states, maintenance log and JANUS settings.
+
+    Everything lives under its own directory, so guilds never share a file.
+    """
+
+    def __init__(self, guild_id, directory, template_path=None, log_template_path=None):
+        self.guild_id = guild_id
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+        zone_path = os.path.join(directory, "zone_state.json")
+        self.zone_states = self._read(zone_path)
+        new_ship = self.zone_states is None
+        if new_ship:
+            # New ship: start from the template state shipped with the bot
+            self.zone_states = (self._read(template_path) if template_path else None) or {}
+        self.zone_store = persephone_store.JSONStore(zone_path, self.zone_states)
+
+        settings_path = os.path.join(directory, "settings.json")
+        self.settings = self._read(settings_path) or {}
+        self.settings_store = persephone_store.JSONStore(settings_path, self.settings)
+
+        self.maintenance_log = persephone_store.MaintenanceLog(os.path.join(directory, "maintenance_log"))
+        if new_ship and not len(self.maintenance_log) and log_template_path and os.path.exists(log_template_path):
+            # New ship: carry over the history of the single-ship maintenance_log.json
+            self.maintenance_log.import_legacy(log_template_path)
+
+        # Values computed from this guild's state (e.g. its route table); dropped with it on eviction
+        self.derived = {}
+
+    @staticmethod
+    def _read(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    async def flush(self):
+        await self.zone_store.flush()
+        await self.settings_store.flush()
+        await self.maintenance_log.flush()
+
+
+class GuildStateEngine:
+    """Per-guild state, loaded lazily on first use and evicted under an LRU cap.
+
+    Evicted guilds are flushed in the background; loading a guild that is
+    still being flushed waits for the flush so it never reads stale files.
+    """
+
+    def __init__(self, directory, template_path=None, max_loaded=32, log_template_path=None):
+        self.directory = directory
+        self.template_path = template_path
+        self.log_template_path = log_template_path
+        self.max_loaded = max_loaded
+        self._loaded = OrderedDict()  # key -> GuildState, least recently used first
+        self._loading = {}  # key -> load task
+        self._evicting = {}  # key -> flush task
+
+    @staticmethod
+    def _key(guild_id):
+        return "direct" if guild_id is None else str(guild_id)
+
+    async def get(self, guild_id):
+        key = self._key(guild_id)
+        state = self._loaded.get(key)
+        if state is not None:
+            self._loaded.move_to_end(key)
+            return state
+
+        if key not in self._loading:
+            self._loading[key] = asyncio.create_task(self._load(key, guild_id))
+        try:
+            return await asyncio.shield(self._loading[key])
+        finally:
+            if key in self._loading and self._loading[key].done():
+                del self._loading[key]
+
+    async def _load(self, key, guild_id):
+        flushing = self._evicting.get(key)
+        if flushing is not None:
+            await flushing
+        directory = os.path.join(self.directory, key)
+        state = await asyncio.to_thread(GuildState, guild_id, directory, self.template_path,
+                                        self.log_template_path)
+        self._loaded[key] = state
+        self._evict()
+        return state
+
+    def _evict(self):
+        while len(self._loaded) > self.max_loaded:
+            key, state = self._loaded.popitem(last=False)
+            task = asyncio.create_task(state.flush())
+            self._evicting[key] = task
+            task.add_done_callback(lambda t, key=key: self._evicting.get(key) is t and self._evicting.pop(key))
+
+    async def flush_all(self):
+        """Write every loaded guild's pending changes to disk."""
+        for state in list(self._loaded.values()):
+            await state.flush()
+        if self._evicting:
+            await asyncio.gather(*self._evicting.values())
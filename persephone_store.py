@@ -0,0 +1,269 @@
+import asyncio
+import json
+import os
+from datetime import datetime
+import janus_metrics
+
+store_write_latency = janus_metrics.registry.histogram(
+    "janus_store_write_seconds", "JSON document write time (serialize excluded)")
+log_write_latency = janus_metrics.registry.histogram(
+    "janus_maintenance_log_write_seconds", "Maintenance log batch write time")
+write_errors = janus_metrics.registry.counter("janus_store_write_errors_total", "Failed persistence writes")
+
+
+def write_atomic(path, text):
+    """Write text to path via a temp file and rename, so readers never see a partial file."""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+class JSONStore:
+    """Write-behind persistence for one JSON document.
+
+    mark_dirty() schedules a single write after a short delay, so a burst of
+    mutations costs one write. The document is serialized on the event loop
+    (where it is mutated) and written from a worker thread.
+    """
+
+    def __init__(self, path, data, delay=0.5):
+        self.path = path
+        self.data = data
+        self.delay = delay
+        self._dirty = False
+        self._task = None
+        self._lock = asyncio.Lock()
+
+    def mark_dirty(self):
+        self._dirty = True
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            # No event loop (e.g. scripts and startup code): write straight away
+            self._dirty = False
+            write_atomic(self.path, json.dumps(self.data, indent=4))
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._write_later())
+
+    async def _write_later(self):
+        await asyncio.sleep(self.delay)
+        await self.flush()
+
+    async def flush(self):
+        """Write the document now if it has unsaved changes."""
+        async with self._lock:
+            if not self._dirty:
+                return
+            self._dirty = False
+            text = json.dumps(self.data, indent=4)
+            try:
+                with store_write_latency.time():
+                    await asyncio.to_thread(write_atomic, self.path, text)
+            except Exception as e:
+                self._dirty = True
+                write_errors.inc()
+                print(f"Failed to save {os.path.basename(self.path)}: {e}")
+
+
+class MaintenanceLog:
+    """Append-only maintenance log split into fixed-size JSON-lines segments.
+
+    Every segment carries an index (entry count, first/last timestamp and
+    per-zone counts); sealed segments persist it in a small sidecar file.
+    Queries use the index to skip segments outright, so only the segments
+    that can hold the requested page are ever read. Appends are buffered
+    and written off the event loop like JSONStore.
+    """
+
+    def __init__(self, directory, segment_size=500, delay=0.5):
+        self.directory = directory
+        self.segment_size = segment_size
+        self.delay = delay
+        self._segments = []  # Oldest first: {"id", "count", "first", "last", "zones"}
+        self._pending = []  # (segment id, entry) not yet on disk
+        self._sealed = []  # Segment ids whose sidecar index still needs writing
+        self._task = None
+        self._lock = asyncio.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    def __len__(self):
+        return sum(segment["count"] for segment in self._segments)
+
+    def _segment_path(self, segment_id):
+        return os.path.join(self.directory, f"segment-{segment_id:06d}.jsonl")
+
+    def _index_path(self, segment_id):
+        return os.path.join(self.directory, f"segment-{segment_id:06d}.idx.json")
+
+    def _load_index(self):
+        ids = sorted(int(name[8:14]) for name in os.listdir(self.directory)
+                     if name.startswith("segment-") and name.endswith(".jsonl"))
+        for segment_id in ids:
+            try:
+                with open(self._index_path(segment_id), "r", encoding="utf-8") as f:
+                    segment = json.load(f)
+            except (FileNotFoundError, ValueError):
+                # The active segment has no sidecar yet; index it by scanning
+                self._repair_tail(segment_id)
+                segment = {"id": segment_id, "count": 0, "first": None, "last": None, "zones": {}}
+                for entry in self._read_segment(segment_id):
+                    self._index_entry(segment, entry)
+            self._segments.append(segment)
+
+    def _repair_tail(self, segment_id):
+        """Cut a line torn by a crash mid-append off the end of a segment, so appends start clean."""
+        path = self._segment_path(segment_id)
+        with open(path, "rb") as f:
+            data = f.read()
+        keep = len(data)
+        if not data.endswith(b"\n"):
+            keep = data.rfind(b"\n") + 1
+        lines = data[:keep].splitlines()
+        if lines:
+            try:
+                json.loads(lines[-1])
+            except ValueError:
+                keep -= len(lines[-1]) + 1
+        if keep < len(data):
+            print(f"Dropping torn entry at the end of {os.path.basename(path)}")
+            os.truncate(path, keep)
+
+    def _read_segment(self, segment_id):
+        with open(self._segment_path(segment_id), "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue  # Torn by an earlier crash; the index never counted it
+
+    @staticmethod
+    def _index_entry(segment, entry):
+        segment["count"] += 1
+        segment["first"] = segment["first"] or entry["ts"]
+        segment["last"] = entry["ts"]
+        segment["zones"][entry["zone"]] = segment["zones"].get(entry["zone"], 0) + 1
+
+    def append(self, zone, action, timestamp=None):
+        """Record one maintenance action; O(1) regardless of log size."""
+        entry = {
+            "ts": timestamp or datetime.now().strftime("%Y-%m-%d %H:%M"),
+            "zone": zone,
+            "action": action,
+        }
+        if not self._segments or self._segments[-1]["count"] >= self.segment_size:
+            next_id = self._segments[-1]["id"] + 1 if self._segments else 1
+            self._segments.append({"id": next_id, "count": 0, "first": None, "last": None, "zones": {}})
+        segment = self._segments[-1]
+        self._index_entry(segment, entry)
+        self._pending.append((segment["id"], entry))
+        if segment["count"] >= self.segment_size:
+            self._sealed.append(segment["id"])
+
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            self._write_pending(*self._take_pending())
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._write_later())
+
+    def import_legacy(self, path):
+        """Load entries from the old single-file maintenance_log.json format."""
+        with open(path, "r", encoding="utf-8") as f:
+            lines = json.load(f).get("log", [])
+        for line in lines:
+            timestamp, _, rest = line.partition(" — ")
+            zone, _, action = rest.partition(": ")
+            self.append(zone, action, timestamp)
+
+    def _take_pending(self):
+        pending, self._pending = self._pending, []
+        sealed, self._sealed = self._sealed, []
+        return pending, [s for s in self._segments if s["id"] in sealed]
+
+    def _write_pending(self, pending, sealed, written=None):
+        """Append pending entries and write sealed indexes, adding each finished file to `written`."""
+        written = set() if written is None else written
+        by_segment = {}
+        for segment_id, entry in pending:
+            by_segment.setdefault(segment_id, []).append(json.dumps(entry, ensure_ascii=False))
+        for segment_id, lines in by_segment.items():
+            path = self._segment_path(segment_id)
+            size = os.path.getsize(path) if os.path.exists(path) else 0
+            try:
+                with open(path, "a", encoding="utf-8") as f:
+                    f.write("\n".join(lines) + "\n")
+            except BaseException:
+                # Don't leave a torn line for the retry to append after
+                try:
+                    os.truncate(path, size)
+                except OSError:
+                    pass
+                raise
+            written.add(("segment", segment_id))
+        for segment in sealed:
+            write_atomic(self._index_path(segment["id"]), json.dumps(segment))
+            written.add(("index", segment["id"]))
+
+    async def _write_later(self):
+        await asyncio.sleep(self.delay)
+        await self.flush()
+
+    async def flush(self):
+        """Write buffered entries to disk now."""
+        async with self._lock:
+            if not self._pending and not self._sealed:
+                return
+            pending, sealed = self._take_pending()
+            # Copy sealed indexes on the loop; they are immutable from here on
+            sealed = [dict(segment, zones=dict(segment["zones"])) for segment in sealed]
+            written = set()
+            try:
+                with log_write_latency.time():
+                    await asyncio.to_thread(self._write_pending, pending, sealed, written)
+            except Exception as e:
+                # The index already counts these entries, so keep what was not written for the next flush
+                self._pending[:0] = [(i, entry) for i, entry in pending if ("segment", i) not in written]
+                self._sealed[:0] = [segment["id"] for segment in sealed if ("index", segment["id"]) not in written]
+                write_errors.inc()
+                print(f"Failed to write maintenance log: {e}")
+
+    async def query(self, zone=None, since=None, page=1, per_page=10):
+        """Return (entries, has_more) for one page of matches, newest page first.
+
+        zone filters by exact zone name and since by a "YYYY-MM-DD HH:MM"
+        timestamp. Entries within the page are in chronological order.
+        """
+        await self.flush()
+        async with self._lock:
+            segments = [dict(segment) for segment in self._segments]
+            return await asyncio.to_thread(self._query, segments, zone, since, page, per_page)
+
+    def _query(self, segments, zone, since, page, per_page):
+        skip = (page - 1) * per_page
+        found = []
+        for segment in reversed(segments):
+            if since and segment["last"] and segment["last"] < since:
+                break  # Segments are chronological; everything older is out of range
+            matches = segment["zones"].get(zone, 0) if zone else segment["count"]
+            if not matches:
+                continue
+            if not since and skip >= matches:
+                skip -= matches  # The index alone says this whole segment is on earlier pages
+                continue
+            entries = [e for e in self._read_segment(segment["id"])
+                       if (not zone or e["zone"] == zone) and (not since or e["ts"] >= since)]
+            for entry in reversed(entries):
+                if skip:
+                    skip -= 1
+                    continue
+                found.append(entry)
+                if len(found) > per_page:
+                    return list(reversed(found[:per_page])), True
+        return list(reversed(found)), False
@@ -0,0 +1,102 @@
+from collections import OrderedDict, deque
+
+
+class ShipGraph:
+    """Zone connectivity built from ship_data.json["schematic"]["zones"].
+
+    Connections are treated as two-way even if the schematic only lists
+    them on one side.
+    """
+
+    def __init__(self, schematic_zones):
+        self.neighbours = {}
+        for zone, info in schematic_zones.items():
+            self.neighbours.setdefault(zone, [])
+            for other in info.get("connects_to", []):
+                self.neighbours.setdefault(other, [])
+                if other not in self.neighbours[zone]:
+                    self.neighbours[zone].append(other)
+                if zone not in self.neighbours[other]:
+                    self.neighbours[other].append(zone)
+
+    def __contains__(self, zone):
+        return zone in self.neighbours
+
+    def paths_from(self, source, blocked):
+        """Breadth-first shortest paths from source that avoid blocked zones."""
+        paths = {source: (source,)}
+        queue = deque([source])
+        while queue:
+            zone = queue.popleft()
+            for other in self.neighbours[zone]:
+                if other not in paths and other not in blocked:
+                    paths[other] = paths[zone] + (other,)
+                    queue.append(other)
+        return paths
+
+
+class RouteTable:
+    """All-pairs shortest paths for one set of blocked (impassable) zones."""
+
+    def __init__(self, graph, blocked, paths=None):
+        self.graph = graph
+        self.blocked = blocked
+        if paths is None:
+            paths = {zone: graph.paths_from(zone, blocked) for zone in graph.neighbours if zone not in blocked}
+        self._paths = paths  # source -> {target: path}
+
+    def route(self, source, target):
+        """Shortest path from source to target as a tuple of zones, or None if cut off."""
+        return self._paths.get(source, {}).get(target)
+
+    def reachable(self, source):
+        return set(self._paths.get(source, ()))
+
+    def with_blocked(self, zone):
+        """Derive the table for one more blocked zone.
+
+        Blocking a zone can only remove options, so any source whose paths
+        never pass through it keeps its paths unchanged; only the rest are
+        recomputed.
+        """
+        blocked = self.blocked | {zone}
+        paths = {}
+        for source, targets in self._paths.items():
+            if source == zone:
+                continue
+            if zone in targets:
+                paths[source] = self.graph.paths_from(source, blocked)
+            else:
+                paths[source] = targets
+        return RouteTable(self.graph, blocked, paths)
+
+
+class TopologyEngine:
+    """Route tables keyed by blocked-zone set, shared by every guild.
+
+    Tables are cached (LRU) per blocked set. When a guild blocks one more
+    zone, its previous table is updated incrementally instead of being
+    recomputed from scratch.
+    """
+
+    def __init__(self, graph, cache_size=64):
+        self.graph = graph
+        self.cache_size = cache_size
+        self._tables = OrderedDict()
+
+    def table(self, blocked, previous=None):
+        blocked = frozenset(zone for zone in blocked if zone in self.graph)
+        table = self._tables.get(blocked)
+        if table is not None:
+            self._tables.move_to_end(blocked)
+            return table
+
+        added = blocked - previous.blocked if previous and previous.graph is self.graph else None
+        if added is not None and len(added) == 1 and previous.blocked <= blocked:
+            table = previous.with_blocked(next(iter(added)))
+        else:
+            table = RouteTable(self.graph, blocked)
+        self._tables[blocked] = table
+        if len(self._tables) > self.cache_size:
+            self._tables.popitem(last=False)
+        return table